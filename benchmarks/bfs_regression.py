@@ -0,0 +1,92 @@
+"""
+Compares the nodes expanded by the BFS against the old version of
+the search, that only ever marked the initial state as visited and
+so let duplicate states pile up in its queue. It also checks the
+current counts against the ones recorded when the fix was made, and
+exits with an error if any of them got worse.
+
+Run from the repository root with:
+    python -m benchmarks.bfs_regression
+"""
+from collections import deque
+import sys
+from time import time
+
+from model.klotski import Klotski
+from model.visited_set import VisitedSet
+
+
+boards = ('board0', 'board1', 'board3', 'board8', 'board10', 'board11', 'board45')
+
+# nodes expanded by Klotski.bfs when visited states started being
+# marked on enqueue, lowered since by the mirror symmetry reduction
+expected_expansions = {
+    'board0': 46,
+    'board1': 6224,
+    'board3': 9643,
+    'board8': 764,
+    'board10': 764,
+    'board11': 1220,
+    'board45': 14119,
+}
+
+legacy_max_nodes = 200000
+
+
+def legacy_bfs(game, max_nodes):
+    """
+    The BFS as it was before marking states on enqueue, kept here
+    only to be measured.
+
+    Returns:
+        int: Nodes expanded until a final state was popped, or None
+        if max_nodes ran out first.
+    """
+    queue = deque([game.state])
+    visited = VisitedSet(game.state)
+    expanded_nodes = 0
+
+    while queue:
+        current = queue.popleft()
+        visited.add(game.state)
+        expanded_nodes += 1
+
+        if current.is_complete():
+            return expanded_nodes
+        if expanded_nodes >= max_nodes:
+            return None
+
+        for child in current.children():
+            if child not in visited:
+                queue.append(child)
+
+    return None
+
+
+def main():
+    game = Klotski()
+    regressions = []
+
+    print(f'{"board":<10}{"legacy":>12}{"current":>12}{"expected":>12}{"moves":>8}{"time":>8}')
+    for board in boards:
+        game.read_board(f'inputs/set1/{board}.txt')
+        legacy = legacy_bfs(game, legacy_max_nodes)
+
+        start_time = time()
+        result = game.bfs()
+        exec_time = time() - start_time
+
+        legacy = f'>{legacy_max_nodes}' if legacy is None else str(legacy)
+        print(f'{board:<10}{legacy:>12}{game.expanded_nodes:>12}{expected_expansions[board]:>12}'
+              f'{result.depth:>8}{exec_time:>8.2f}')
+
+        if game.expanded_nodes > expected_expansions[board]:
+            regressions.append(board)
+
+    if regressions:
+        print(f'Expanded nodes regressed on: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Runs a search with a SearchInstrumentation and prints its counters
+and the time spent in each phase. It can also save the phase timings
+as collapsed stacks, to be drawn with flamegraph.pl or speedscope,
+and the whole report with the frontier samples as JSON.
+
+Run from the repository root with:
+    python -m benchmarks.profile_search board45 bfs [-o bfs.folded] [-j bfs.json]
+"""
+import argparse
+import json
+
+from controller.controller import Controller
+from model.instrumentation import SearchInstrumentation
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profiles a search algorithm on a level.')
+    parser.add_argument('board')
+    parser.add_argument('alg', choices=list(Controller.search_args))
+    parser.add_argument('-o', '--collapsed', help='file for the collapsed stacks')
+    parser.add_argument('-j', '--json', help='file for the full report')
+    args = parser.parse_args()
+
+    controller = Controller(solution_cache=False)
+    controller.load_game(args.board)
+    game = controller.game
+    instrumentation = game.instrumentation = SearchInstrumentation()
+
+    controller.search_algs[args.alg](*controller.search_args[args.alg])
+
+    for record in instrumentation.get_report():
+        print(f'{record["search"]}: {record["time"]:.3f} sec, {record["expanded"]} expanded, '
+              f'{record["generated"]} generated, {record["deduplicated"]} deduplicated')
+        for phase, elapsed in sorted(record['phases'].items(), key=lambda x: -x[1]):
+            print(f'  {phase:<12}{elapsed:>9.3f} sec{100 * elapsed / record["time"]:>7.1f}%')
+        if record['frontier_samples']:
+            peak = max(sample[2] for sample in record['frontier_samples'])
+            print(f'  frontier peak (sampled): {peak}')
+
+    if args.collapsed:
+        instrumentation.export_collapsed(args.collapsed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(instrumentation.get_report(), f)
+
+
+if __name__ == '__main__':
+    main()
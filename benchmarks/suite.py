@@ -0,0 +1,212 @@
+"""
+Benchmark suite of the search algorithms. Each level and algorithm
+pair runs in a fresh process, a few warmup runs first and then the
+measured repetitions, so that the peak RSS reported by getrusage
+belongs to that search alone. Nothing is traced or reported while
+measuring, unlike the tracemalloc figures of the Controller; the
+frontier is sampled in a separate run once the measurements are taken.
+
+For every pair it reports the median time, the nodes expanded per
+second, the peak RSS, the frontier high-water mark and the solution
+length. Each run is appended to a history file, and the results are
+compared against the previous run of the same pairs: the script
+exits with an error if any of them regressed.
+
+Run from the repository root with:
+    python -m benchmarks.suite [-b board0 board3] [-a greedy a_star] [-r 5]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from statistics import median
+import subprocess
+import sys
+from time import perf_counter, time
+
+from controller.controller import Controller
+from model.klotski import Klotski
+
+
+boards = ('board0', 'board3', 'board8', 'board10', 'board11')
+algs = ('greedy', 'a_star', 'a_star_opt', 'bfs')
+
+# kept with the other generated files, out of the tracked tree
+history_path = 'cache/benchmarks/history.jsonl'
+
+# relative change in throughput or memory taken as a regression
+tolerance = .1
+
+
+def _measure(file_path, method_name, args, warmup, repetitions, connection):
+    """
+    Runs a search several times in the current process, sending the
+    measurements through the connection. The warmup and the timed
+    repetitions run without progress reports, as a search normally
+    does; the frontier high-water mark is taken in one more run
+    afterwards, which reports on every expansion and isn't timed.
+    """
+    # imported here as it's only available on Unix
+    import resource
+
+    game = Klotski()
+    game.read_board(file_path)
+
+    for _ in range(warmup):
+        getattr(game, method_name)(*args)
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times = []
+    for _ in range(repetitions):
+        start_time = perf_counter()
+        result = getattr(game, method_name)(*args)
+        times.append(perf_counter() - start_time)
+    expanded_nodes = game.expanded_nodes
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # the frontier size is sampled on every expansion
+    frontier = [0]
+    game.progress_interval = 1
+    game.progress = lambda expanded_nodes, frontier_size: \
+        frontier.__setitem__(0, max(frontier[0], frontier_size))
+    getattr(game, method_name)(*args)
+
+    connection.send({
+        'times': times,
+        'expanded_nodes': expanded_nodes,
+        'n_moves': result.depth if result is not None else None,
+        'frontier_peak': frontier[0],
+        'baseline_rss': baseline_rss * 1024,
+        'peak_rss': peak_rss * 1024,
+    })
+
+
+def run_benchmark(board, alg, warmup, repetitions):
+    """
+    Measures an algorithm on a level in a new process.
+
+    Returns:
+        dict: The measurements of the pair.
+    """
+    controller = Controller(solution_cache=False)
+    parent_end, child_end = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_measure,
+        args=(f'{controller.inputs_folder}{board}.txt', controller.search_algs[alg].__name__,
+              controller.search_args[alg], warmup, repetitions, child_end))
+    process.start()
+    child_end.close()
+    measurements = parent_end.recv()
+    process.join()
+
+    exec_time = median(measurements['times'])
+    return {
+        'board': board,
+        'alg': alg,
+        'exec_time': exec_time,
+        'min_time': min(measurements['times']),
+        'nodes_per_sec': measurements['expanded_nodes'] / exec_time if exec_time else None,
+        'expanded_nodes': measurements['expanded_nodes'],
+        'n_moves': measurements['n_moves'],
+        'frontier_peak': measurements['frontier_peak'],
+        'baseline_rss': measurements['baseline_rss'],
+        'peak_rss': measurements['peak_rss'],
+    }
+
+
+def load_history():
+    """
+    Reads the previous runs of the suite.
+
+    Returns:
+        list of dict: Each run, the oldest first.
+    """
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(run):
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def find_regressions(result, previous):
+    """
+    Compares the result of a pair with the one of a previous run.
+
+    Returns:
+        list of str: Description of each regression.
+    """
+    regressions = []
+    if previous['expanded_nodes'] is not None and result['expanded_nodes'] > previous['expanded_nodes']:
+        regressions.append(f'expanded nodes {previous["expanded_nodes"]} -> {result["expanded_nodes"]}')
+    if previous['n_moves'] is not None and (result['n_moves'] is None or result['n_moves'] > previous['n_moves']):
+        regressions.append(f'solution length {previous["n_moves"]} -> {result["n_moves"]}')
+    if previous['nodes_per_sec'] and result['nodes_per_sec'] < previous['nodes_per_sec'] * (1 - tolerance):
+        regressions.append(f'nodes/sec {previous["nodes_per_sec"]:.0f} -> {result["nodes_per_sec"]:.0f}')
+    if result['peak_rss'] > previous['peak_rss'] * (1 + tolerance):
+        regressions.append(f'peak RSS {previous["peak_rss"]} -> {result["peak_rss"]}')
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the search algorithms.')
+    parser.add_argument('-b', '--boards', nargs='+', default=boards)
+    parser.add_argument('-a', '--algs', nargs='+', default=algs, choices=list(Controller.search_args))
+    parser.add_argument('-w', '--warmup', type=int, default=1)
+    parser.add_argument('-r', '--repetitions', type=int, default=3)
+    parser.add_argument('--no-save', action='store_true', help="don't append the run to the history")
+    args = parser.parse_args()
+
+    # latest result of each pair in the history
+    previous = dict()
+    for run in load_history():
+        for result in run['results']:
+            previous[(result['board'], result['alg'])] = result
+
+    print(f'{"board":<10}{"alg":<12}{"time":>9}{"nodes/s":>10}{"nodes":>9}{"moves":>7}'
+          f'{"frontier":>10}{"peak RSS":>12}')
+    results = []
+    regressions = []
+    for board in args.boards:
+        for alg in args.algs:
+            result = run_benchmark(board, alg, args.warmup, args.repetitions)
+            results.append(result)
+            print(f'{board:<10}{alg:<12}{result["exec_time"]:>9.3f}{result["nodes_per_sec"] or 0:>10.0f}'
+                  f'{result["expanded_nodes"]:>9}{str(result["n_moves"]):>7}{result["frontier_peak"]:>10}'
+                  f'{result["peak_rss"] / 2**20:>10.1f}MB')
+
+            if (board, alg) in previous:
+                for regression in find_regressions(result, previous[(board, alg)]):
+                    regressions.append(f'{board} {alg}: {regression}')
+
+    if not args.no_save:
+        save_run({
+            'timestamp': time(),
+            'revision': git_revision(),
+            'warmup': args.warmup,
+            'repetitions': args.repetitions,
+            'results': results,
+        })
+
+    if regressions:
+        print('Regressions against the previous run:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
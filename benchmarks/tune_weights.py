@@ -0,0 +1,202 @@
+"""
+Tuner of the heuristic weights (manhattan_multi, zeros_empty_multi and
+inbet_multi) of the weighted searches. Every combination, taken from a
+grid or sampled at random, is run on every level of a folder in a
+process pool, and scored on the total nodes expanded, wall time and
+solution length. The combinations that aren't beaten on all three at
+once (the Pareto front) are saved, to be loaded into the Controller's
+search_args with Controller.load_search_args.
+
+Run from the repository root with:
+    python -m benchmarks.tune_weights [-a greedy a_star] [-n 50] [-j 4] [-o cache/tuned_weights.json]
+"""
+import argparse
+from itertools import product
+import json
+import multiprocessing
+import os
+import random
+from time import perf_counter
+
+from controller.controller import Controller
+from model.klotski import Klotski
+
+
+# algorithms whose first three arguments are the heuristic weights
+tunable_algs = ('greedy', 'a_star', 'greedy_bounded', 'beam')
+
+grid = {
+    'manhattan_multi': (1, 2, 4, 8, 12, 16),
+    'zeros_empty_multi': (0, .5, 1, 2),
+    'inbet_multi': (0, 1, 2, 4),
+}
+
+# ranges the random combinations are sampled from
+ranges = {
+    'manhattan_multi': (0, 20),
+    'zeros_empty_multi': (0, 5),
+    'inbet_multi': (0, 5),
+}
+
+objectives = ('expanded_nodes', 'exec_time', 'n_moves')
+
+# kept with the other generated files, out of the tracked tree
+output_path = 'cache/tuned_weights.json'
+
+
+def grid_combinations():
+    return list(product(*grid.values()))
+
+
+def random_combinations(n, seed=None):
+    """
+    Samples weight combinations uniformly from the ranges, rounded to
+    two decimals.
+    """
+    rng = random.Random(seed)
+    return [tuple(round(rng.uniform(low, high), 2) for low, high in ranges.values()) for _ in range(n)]
+
+
+def _evaluate(task):
+    """
+    Runs a weight combination on every level, in a pool worker.
+
+    Args:
+        task (tuple): The algorithm, its method name, the weights, the
+        rest of its arguments and the board files.
+
+    Returns:
+        dict: The algorithm, the weights, the totals of each objective
+        and the levels left unsolved.
+    """
+    alg, method_name, weights, extra_args, file_paths = task
+    totals = dict.fromkeys(objectives, 0)
+    unsolved = []
+    for file_path in file_paths:
+        game = Klotski()
+        game.read_board(file_path)
+
+        start_time = perf_counter()
+        result = getattr(game, method_name)(*weights, *extra_args)
+        totals['exec_time'] += perf_counter() - start_time
+        totals['expanded_nodes'] += game.expanded_nodes
+        if result is None:
+            unsolved.append(os.path.basename(file_path))
+        else:
+            totals['n_moves'] += result.depth
+
+    return dict(alg=alg, weights=list(weights), unsolved=unsolved, **totals)
+
+
+def dominates(a, b):
+    """
+    Whether a score is at least as good as another on every objective
+    and better on one of them.
+    """
+    return all(a[o] <= b[o] for o in objectives) and any(a[o] < b[o] for o in objectives)
+
+
+def pareto_front(scores):
+    """
+    Keeps the scores of the combinations that solved every level and
+    aren't dominated by another one, ordered by nodes expanded.
+    """
+    solved = [s for s in scores if not s['unsolved']]
+    front = [s for s in solved if not any(dominates(other, s) for other in solved)]
+    return sorted(front, key=lambda s: [s[o] for o in objectives])
+
+
+def tune(algs, combinations, inputs_folder, n_workers=None, verbose=True):
+    """
+    Scores every combination of weights for each algorithm.
+
+    Args:
+        algs (list of str): The algorithms, among tunable_algs.
+
+        combinations (list of tuples): The weight combinations.
+
+        inputs_folder (str): Folder with the board files.
+
+        n_workers (int, optional): Processes of the pool. Defaults to
+        None, for the amount of CPUs.
+
+        verbose (boolean, optional): Whether to print each score.
+        Defaults to True.
+
+    Returns:
+        dict: The Pareto front of each algorithm.
+    """
+    controller = Controller(solution_cache=False)
+    file_paths = [os.path.join(inputs_folder, f) for f in sorted(os.listdir(inputs_folder)) if f.endswith('.txt')]
+
+    tasks = []
+    for alg in algs:
+        method_name = controller.search_algs[alg].__name__
+        extra_args = controller.search_args[alg][3:]
+        # the current weights are always scored, as a reference
+        for weights in dict.fromkeys([controller.search_args[alg][:3]] + combinations):
+            tasks.append((alg, method_name, weights, extra_args, file_paths))
+
+    scores = {alg: [] for alg in algs}
+    with multiprocessing.Pool(n_workers) as pool:
+        for score in pool.imap_unordered(_evaluate, tasks):
+            scores[score['alg']].append(score)
+            if verbose:
+                status = f'unsolved {",".join(score["unsolved"])}' if score['unsolved'] else ''
+                print(f'{score["alg"]:<16}{str(tuple(score["weights"])):<20}{score["expanded_nodes"]:>10}'
+                      f'{score["exec_time"]:>9.2f}{score["n_moves"]:>8}  {status}')
+
+    return {alg: pareto_front(alg_scores) for alg, alg_scores in scores.items()}
+
+
+def save(fronts, file_path):
+    """
+    Saves the Pareto fronts, keeping the ones of other algorithms
+    already in the file.
+    """
+    folder = os.path.dirname(file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    saved = dict()
+    if os.path.exists(file_path):
+        with open(file_path) as f:
+            saved = json.load(f)
+    for alg, front in fronts.items():
+        saved[alg] = [{'weights': s['weights'], **{o: s[o] for o in objectives}} for s in front]
+
+    with open(file_path, 'w') as f:
+        json.dump(saved, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tunes the heuristic weights of the weighted searches.')
+    parser.add_argument('-a', '--algs', nargs='+', default=('greedy', 'a_star'), choices=tunable_algs)
+    parser.add_argument('-i', '--inputs', default=Controller.inputs_folder,
+                        help='folder with the board files (default: %(default)s)')
+    parser.add_argument('-n', '--samples', type=int,
+                        help='amount of random combinations to try (default: the whole grid)')
+    parser.add_argument('-s', '--seed', type=int, help='seed of the random combinations')
+    parser.add_argument('-j', '--jobs', type=int, help='processes run at the same time (default: CPUs)')
+    parser.add_argument('-o', '--output', default=output_path,
+                        help='file the Pareto fronts are saved to (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.samples is not None:
+        combinations = random_combinations(args.samples, args.seed)
+    else:
+        combinations = grid_combinations()
+
+    fronts = tune(args.algs, combinations, args.inputs, args.jobs)
+    save(fronts, args.output)
+
+    for alg, front in fronts.items():
+        print(f'Pareto front of {alg}:')
+        for s in front:
+            print(f'  {str(tuple(s["weights"])):<20}{s["expanded_nodes"]:>10} nodes'
+                  f'{s["exec_time"]:>9.2f} sec{s["n_moves"]:>8} moves')
+    print(f'Saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
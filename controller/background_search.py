@@ -0,0 +1,246 @@
+import multiprocessing
+from time import time
+import tracemalloc
+
+from model.klotski import Klotski
+from model.level_pack import LevelPack
+
+
+def _peak_rss():
+    """
+    Peak resident memory of the current process, in bytes, or None
+    where getrusage isn't available.
+    """
+    try:
+        # only available on Unix
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _search_worker(level, method_name, args, connection, progress_period, max_memory, trace_memory):
+    """
+    Runs a search in a worker process, sending its progress and its
+    result through the connection. With trace_memory, the search runs
+    under tracemalloc to measure the memory it allocates, which makes
+    it several times slower; the peak RSS is always reported.
+
+    Messages sent:
+        ('progress', expanded_nodes, frontier_size): At most once every
+            progress_period seconds.
+        ('improved', moves, bound): Whenever an anytime search finds a
+            better solution, with its moves and suboptimality bound.
+        ('done', moves, info): The (piece id, direction) moves of the
+            solution and the same information Controller.search_alg
+            stores.
+        ('failed', message): If the search raised or found no solution.
+    """
+    if max_memory is not None:
+        # imported here as it's only available on Unix
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+
+    game = Klotski()
+    if isinstance(level, tuple):
+        pack_path, index = level
+        _, goals, proto_board = LevelPack(pack_path)[index]
+        game.load_level(goals, proto_board)
+    else:
+        game.read_board(level)
+
+    last_report = [0]
+
+    def progress(expanded_nodes, frontier_size):
+        now = time()
+        if now - last_report[0] >= progress_period:
+            last_report[0] = now
+            connection.send(('progress', expanded_nodes, frontier_size))
+
+    def improvement(state, bound):
+        moves = [(s.move.piece_id, s.move.direction) for s in state.path()[1:]]
+        connection.send(('improved', moves, bound))
+
+    game.progress = progress
+    game.improvement = improvement
+
+    try:
+        if trace_memory:
+            tracemalloc.start()
+        start_time = time()
+
+        result = getattr(game, method_name)(*args)
+
+        exec_time = time() - start_time
+        if trace_memory:
+            tm = tracemalloc.get_traced_memory()
+            memory_used = tm[1] - tm[0]
+        else:
+            memory_used = None
+
+        if result is None:
+            connection.send(('failed', 'no solution found'))
+            return
+
+        n_visited, visited_memory = game.get_visited_info()
+        info = {
+            'n_moves': result.depth,
+            'exec_time': exec_time,
+            'memory_used': memory_used,
+            'peak_rss': _peak_rss(),
+            'expanded_nodes': game.expanded_nodes,
+            'n_visited': n_visited,
+            'visited_memory': visited_memory,
+            'solution_bound': game.solution_bound,
+        }
+        moves = [(s.move.piece_id, s.move.direction) for s in result.path()[1:]]
+        connection.send(('done', moves, info))
+
+    except MemoryError:
+        connection.send(('failed', 'memory limit exceeded'))
+
+    except Exception as e:
+        connection.send(('failed', str(e)))
+
+    finally:
+        connection.close()
+
+
+class BackgroundSearch:
+    """
+    A search run in its own process, so the caller never blocks on it.
+    The caller polls it for its progress (nodes expanded, frontier size
+    and elapsed time) and, once it's over, for its result. It can be
+    cancelled at any time and is cancelled by itself once the timeout
+    passes, both by terminating the process. Anytime searches also
+    send each better solution they find before they're done, which is
+    kept as the best solution so far.
+
+    Statuses: 'running', 'done', 'failed', 'cancelled' and 'timeout'.
+    """
+
+    progress_period = .2
+
+    def __init__(self, level, method_name, args, timeout=None, max_memory=None, trace_memory=False):
+        """
+        Starts the search.
+
+        Args:
+            level (str or tuple): The board file of the level, or the
+            path of a LevelPack and the index of the level in it.
+
+            method_name (str): Name of the Klotski search method.
+
+            args (tuple): The arguments of the search method.
+
+            timeout (float, optional): Seconds after which the search is
+            stopped. Defaults to None, for no timeout.
+
+            max_memory (int, optional): Maximum address space of the
+            search process, in bytes, after which the search fails.
+            Only supported on Unix. Defaults to None, for no limit.
+
+            trace_memory (boolean, optional): Whether the memory used is
+            measured with tracemalloc, which slows the search down
+            several times. Defaults to False, for the peak RSS only.
+        """
+        self.timeout = timeout
+        self.status = 'running'
+        self.expanded_nodes = 0
+        self.frontier_size = 0
+        self.moves = None
+        self.info = None
+        # best solution sent by an anytime search and its bound
+        self.best_moves = None
+        self.best_bound = None
+        self.error = None
+
+        self.connection, child_end = multiprocessing.Pipe(duplex=False)
+        # not a daemon, as the parallel BFS starts processes of its own
+        self.process = multiprocessing.Process(
+            target=_search_worker,
+            args=(level, method_name, args, child_end, self.progress_period, max_memory, trace_memory))
+        self.start_time = time()
+        self.process.start()
+        child_end.close()
+
+    @property
+    def elapsed(self):
+        """
+        Seconds since the search started.
+        """
+        return time() - self.start_time
+
+    def poll(self):
+        """
+        Reads the messages sent by the worker and checks the timeout.
+
+        Returns:
+            str: The status of the search.
+        """
+        if self.status != 'running':
+            return self.status
+
+        try:
+            while self.connection.poll():
+                message = self.connection.recv()
+                if message[0] == 'progress':
+                    _, self.expanded_nodes, self.frontier_size = message
+                elif message[0] == 'improved':
+                    _, self.best_moves, self.best_bound = message
+                elif message[0] == 'done':
+                    _, self.moves, self.info = message
+                    self.best_moves, self.best_bound = self.moves, self.info['solution_bound']
+                    self.expanded_nodes = self.info['expanded_nodes']
+                    self._finish('done')
+                    return self.status
+                else:
+                    self.error = message[1]
+                    self._finish('failed')
+                    return self.status
+        except EOFError:
+            self.error = 'the search process ended unexpectedly'
+            self._finish('failed')
+            return self.status
+
+        if self.timeout is not None and self.elapsed > self.timeout:
+            self.error = f'timed out after {self.timeout} sec'
+            self._finish('timeout')
+
+        return self.status
+
+    def cancel(self):
+        """
+        Stops the search, if it's still running.
+        """
+        if self.status == 'running':
+            self._finish('cancelled')
+
+    def _finish(self, status):
+        """
+        Sets the final status, releasing the process and its connection.
+        """
+        self.status = status
+        self.elapsed_at_end = self.elapsed
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+    def get_progress(self):
+        """
+        Returns:
+            dict: The status, nodes expanded, frontier size, elapsed
+            seconds and error message of the search, and the amount of
+            moves and bound of its best solution so far, if any.
+        """
+        return {
+            'status': self.status,
+            'expanded_nodes': self.expanded_nodes,
+            'frontier_size': self.frontier_size,
+            'elapsed': self.elapsed if self.status == 'running' else self.elapsed_at_end,
+            'error': self.error,
+            'best_n_moves': len(self.best_moves) if self.best_moves is not None else None,
+            'best_bound': self.best_bound,
+        }
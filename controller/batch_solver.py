@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+from time import sleep
+
+from controller.background_search import BackgroundSearch
+from controller.controller import Controller
+from model.level_pack import LevelPack
+
+
+class BatchSolver:
+    """
+    Solves every board of a folder with a set of the Controller's
+    search algorithms, without the GUI. Each level and algorithm pair
+    is a job run in its own BackgroundSearch process, a few at a time,
+    with a time limit and a memory limit per job. The jobs aren't run
+    under tracemalloc, so their times are those of the plain searches
+    and their memory is reported as the peak RSS of the process.
+    """
+
+    fields = ('board', 'alg', 'status', 'n_moves', 'exec_time', 'wall_time', 'peak_rss', 'memory_used',
+              'expanded_nodes', 'n_visited', 'visited_memory', 'solution_bound', 'error')
+
+    poll_interval = .05
+
+    def __init__(self, inputs_folder=None, algs=None, n_workers=None, timeout=None, max_memory=None):
+        """
+        Args:
+            inputs_folder (str, optional): Folder with the board files,
+            or a LevelPack file. Defaults to None, for the Controller's
+            inputs_folder.
+
+            algs (list of str, optional): Names of the algorithms to be
+            run, as in Controller.search_algs. Defaults to None, for all
+            of them.
+
+            n_workers (int, optional): Amount of jobs run at the same
+            time. Defaults to None, for the amount of CPUs.
+
+            timeout (float, optional): Seconds after which a job is
+            stopped. Defaults to None, for no limit.
+
+            max_memory (int, optional): Maximum memory of a job, in
+            bytes. Defaults to None, for no limit.
+        """
+        controller = Controller(solution_cache=False)
+        self.inputs_folder = inputs_folder or controller.inputs_folder
+        self.level_pack = LevelPack(self.inputs_folder) if os.path.isfile(self.inputs_folder) else None
+        self.algs = list(algs or controller.search_algs)
+        for alg in self.algs:
+            if alg not in controller.search_algs:
+                raise Exception(f'Unknown algorithm: {alg}')
+
+        self.method_names = {alg: controller.search_algs[alg].__name__ for alg in self.algs}
+        self.search_args = controller.search_args
+        self.n_workers = n_workers or os.cpu_count()
+        self.timeout = timeout
+        self.max_memory = max_memory
+
+    def get_boards(self):
+        """
+        Lists the board names of the level pack, or of the inputs
+        folder in the same order as Controller.get_level_names.
+        """
+        if self.level_pack is not None:
+            return self.level_pack.names()
+        names = [x[:-len('.txt')] for x in os.listdir(self.inputs_folder) if x.endswith('.txt')]
+        return sorted(names, key=Controller.level_sort_key)
+
+    def run(self, verbose=True):
+        """
+        Runs every job.
+
+        Args:
+            verbose (boolean, optional): Whether to print each result
+            when it's done. Defaults to True.
+
+        Returns:
+            list of dict: A row with the fields of each job, in the
+            order of the boards and algorithms.
+        """
+        # jobs are identified by the position of the board, as a level
+        # pack may repeat names
+        boards = self.get_boards()
+        pending = [(i, alg) for i in range(len(boards)) for alg in self.algs]
+        pending.reverse()
+        running = dict()
+        rows = dict()
+
+        while pending or running:
+            while pending and len(running) < self.n_workers:
+                i, alg = pending.pop()
+                if self.level_pack is not None:
+                    level = (self.inputs_folder, i)
+                else:
+                    level = os.path.join(self.inputs_folder, f'{boards[i]}.txt')
+                running[(i, alg)] = BackgroundSearch(
+                    level, self.method_names[alg], self.search_args[alg], self.timeout, self.max_memory)
+
+            for job, search in list(running.items()):
+                if search.poll() == 'running':
+                    continue
+                del running[job]
+                rows[job] = self._make_row(boards[job[0]], job[1], search)
+                if verbose:
+                    print(self._format_row(rows[job]))
+
+            if running:
+                sleep(self.poll_interval)
+
+        return [rows[(i, alg)] for i in range(len(boards)) for alg in self.algs]
+
+    def _make_row(self, board, alg, search):
+        """
+        Builds the result row of a finished job.
+        """
+        row = dict.fromkeys(self.fields)
+        row['board'], row['alg'] = board, alg
+        row['status'] = search.status
+        row['wall_time'] = search.get_progress()['elapsed']
+        row['error'] = search.error
+        if search.info is not None:
+            row.update(search.info)
+        else:
+            row['expanded_nodes'] = search.expanded_nodes
+        return row
+
+    @staticmethod
+    def _format_row(row):
+        if row['status'] == 'done':
+            return (f"{row['board']:<10}{row['alg']:<16}{row['n_moves']:>6} moves"
+                    f"{row['expanded_nodes']:>10} nodes{row['exec_time']:>9.2f} sec")
+        return f"{row['board']:<10}{row['alg']:<16}{row['status']}: {row['error']}"
+
+    @classmethod
+    def save(cls, rows, file_path):
+        """
+        Saves the result rows as CSV or JSON, according to the file's
+        extension.
+
+        Args:
+            rows (list of dict): The rows returned by run.
+
+            file_path (str): The output file, ending in .csv or .json.
+        """
+        folder = os.path.dirname(file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        if file_path.endswith('.json'):
+            with open(file_path, 'w') as f:
+                json.dump(rows, f, indent=2)
+        elif file_path.endswith('.csv'):
+            with open(file_path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=cls.fields)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            raise Exception('The output file must be .csv or .json')
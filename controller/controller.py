@@ -1,8 +1,12 @@
+import json
 import os
 from time import time
 import tracemalloc
 
+from controller.background_search import BackgroundSearch
+from controller.solution_cache import SolutionCache
 from model.klotski import Klotski
+from model.level_pack import LevelPack
 
 
 class Controller:
@@ -16,13 +20,21 @@ class Controller:
     inputs_folder = 'inputs/set1/'
     search_args = {
         'greedy': (12, 1, 2),
+        'greedy_bounded': (12, 1, 2, None, 10000),
+        'beam': (12, 1, 2, 1000),
         'a_star': (12, 1, 2),
+        'a_star_opt': (),
+        'weighted_a_star': (2,),
+        'anytime_a_star': (3, .5, 30),
+        'ida_star': (),
         'bfs': (),
         'dfs': (),
         'i_dfs': (),
+        'parallel_bfs': (),
+        'external_bfs': (),
     }
 
-    def __init__(self, play_interval=.7):
+    def __init__(self, play_interval=.7, solution_cache=True, search_timeout=None, level_pack=None):
         """
         Initiates some attributes that are used in the follow up
         methods.
@@ -31,21 +43,55 @@ class Controller:
             play_interval (float, optional): The amount of time
             it takes between moves in the play animation. Defaults 
             to 0.7.
+
+            solution_cache (boolean, optional): Whether search results
+            are kept in, and taken from, the on-disk SolutionCache.
+            Defaults to True.
+
+            search_timeout (float, optional): Seconds after which the
+            background searches are stopped. Defaults to None, for no
+            timeout.
+
+            level_pack (str, optional): Path of a LevelPack to take the
+            levels from, instead of the board files of inputs_folder.
+            Defaults to None.
         """
         self.play_interval = play_interval
+        self.solution_cache = SolutionCache() if solution_cache else None
+        self.search_timeout = search_timeout
+        self.level_pack = LevelPack(level_pack) if level_pack is not None else None
+        # level names and the modification time of the folder they
+        # were listed at
+        self._level_names = None
 
         self.game = Klotski()
         self.search_algs = {
             'greedy': self.game.greedy_search,
+            'greedy_bounded': self.game.greedy_search,
+            'beam': self.game.beam_search,
             'a_star': self.game.a_star,
+            'a_star_opt': self.game.optimal_a_star,
+            'weighted_a_star': self.game.weighted_a_star,
+            'anytime_a_star': self.game.anytime_a_star,
+            'ida_star': self.game.ida_star,
             'bfs': self.game.bfs,
             'dfs': self.game.dfs,
-            'i_dfs': self.game.iterative_deepening_search
+            'i_dfs': self.game.iterative_deepening_search,
+            'parallel_bfs': self.game.parallel_bfs,
+            'external_bfs': self.game.external_bfs
         }
 
         self.currently_playing_result = False
 
         self.results = dict()
+        # background searches by game id and algorithm
+        self.searches = dict()
+        # background builds of the state spaces hints come from, by
+        # game id
+        self.hint_searches = dict()
+        self.hint_requested = False
+        # displayed board the last hint was found for, and the hint
+        self._last_hint = None
 
     def load_game(self, game_id):
         """
@@ -54,30 +100,90 @@ class Controller:
         Args:
             game_id (int): Game id to be loaded.
         """
-        self.game.read_board(f'{self.inputs_folder}{game_id}.txt')
+        self._read_level(self.game, game_id)
         self.goals = self.game.get_goals()
 
         self.currently_playing_result = False
         self.alg_move_history = dict()
+        self.hint_requested = False
+        self._last_hint = None
 
         if game_id not in self.results.keys():
             self.results[game_id] = dict()
 
         self.game_id = game_id
 
+    def _level_source(self, game_id):
+        """
+        Where a level is read from: its board file, or the level pack
+        and its index in it.
+        """
+        if self.level_pack is not None:
+            return self.level_pack.file_path, self.level_pack.index(game_id)
+        return f'{self.inputs_folder}{game_id}.txt'
+
+    def _read_level(self, game, game_id):
+        """
+        Loads a level into a Klotski.
+        """
+        if self.level_pack is not None:
+            _, goals, proto_board = self.level_pack[self.level_pack.index(game_id)]
+            game.load_level(goals, proto_board)
+        else:
+            game.read_board(self._level_source(game_id))
+
+    def load_search_args(self, file_path, objective='expanded_nodes'):
+        """
+        Replaces the heuristic weights of the algorithms found in a file
+        saved by benchmarks.tune_weights, taking from the Pareto-optimal
+        weights of each the ones best on an objective. Only this
+        controller's search_args are changed.
+
+        Args:
+            file_path (str): The tuned weights file.
+
+            objective (str, optional): 'expanded_nodes', 'exec_time' or
+            'n_moves'. Defaults to 'expanded_nodes'.
+        """
+        with open(file_path) as f:
+            tuned = json.load(f)
+
+        self.search_args = dict(self.search_args)
+        for alg, front in tuned.items():
+            if alg not in self.search_args or not front:
+                continue
+            best = min(front, key=lambda x: x[objective])
+            # arguments after the weights, as the beam width, are kept
+            self.search_args[alg] = tuple(best['weights']) + self.search_args[alg][3:]
+
     def get_current_game_id(self):
         return self.game_id
 
+    @staticmethod
+    def level_sort_key(name):
+        """
+        Sort key of the level names: by the number in the name, so that
+        board2 comes before board10, then by the name itself.
+        """
+        return int(''.join(c for c in name if c.isdigit()) or 0), name
+
     def get_level_names(self):
         """
-        Lists the level names in the input folder.
+        Lists the level names in the level pack or the input folder.
+        The folder is only listed again when it's modified.
 
         Returns:
             list of str: Level names in the input folder.
         """
-        return [x.replace('.txt', '')
-                for x in
-                sorted(os.listdir(self.inputs_folder), key=lambda x: int(''.join(c for c in x if c.isdigit())))]
+        if self.level_pack is not None:
+            return self.level_pack.names()
+
+        modified = os.stat(self.inputs_folder).st_mtime_ns
+        if self._level_names is None or self._level_names[0] != modified:
+            names = sorted((x.replace('.txt', '') for x in os.listdir(self.inputs_folder)),
+                           key=self.level_sort_key)
+            self._level_names = (modified, names)
+        return self._level_names[1]
 
     def get_current_board(self):
         """
@@ -115,6 +221,7 @@ class Controller:
         Returns:
             boolean: True if done, False if not.
         """
+        self.poll_searches()
         try:
             self.results[self.game_id][alg]
             return True
@@ -123,43 +230,284 @@ class Controller:
 
     def play(self, alg):
         """
-        Starts the play animation
+        Starts the play animation. While an anytime search is still
+        running, its best solution so far is played.
 
         Args:
             alg (str): The algorithm result to be played.
         """
-        assert self.results[self.game_id][alg] is not None
-        self.move_history = self.results[self.game_id][alg]['move_history']
+        if self.is_alg_ready(alg):
+            self.move_history = self.results[self.game_id][alg]['move_history']
+        else:
+            best = self.get_best_solution(alg)
+            assert best is not None
+            self.move_history = best['move_history']
         self._init_play_animation()
 
     def search_alg(self, alg):
         """
         Performs the search algorithm and extracts information
-        from it.
+        from it. Nothing is stored if it finds no solution, as the
+        bounded searches may not.
 
         Args:
             alg (str): Algorithm to be run.
+
+        Returns:
+            boolean: True if the result is stored, False if the search
+            found no solution.
         """
-        print('Searching...')
+        if self._load_cached_result(alg):
+            return True
 
-        args = self.search_args[alg]
+        print('Searching...')
 
         tracemalloc.start()
         start_time = time()
 
-        result = self.search_algs[alg](*args)
+        result = self.search_algs[alg](*self.search_args[alg])
 
         exec_time = time() - start_time
         tm = tracemalloc.get_traced_memory()
         memory_used = tm[1] - tm[0]
+        tracemalloc.stop()
+
+        if result is None:
+            print('No solution found')
+            return False
+
+        info = dict()
+        info['n_moves'] = result.depth
+        info['exec_time'] = exec_time
+        info['memory_used'] = memory_used
+        info['expanded_nodes'] = self.game.expanded_nodes
+        info['n_visited'], info['visited_memory'] = self.game.get_visited_info()
+        info['solution_bound'] = self.game.solution_bound
 
-        self.results[self.game_id][alg] = dict()
-        self.results[self.game_id][alg]['move_history'] = result.move_history
-        self.results[self.game_id][alg]['n_moves'] = len(result.move_history) - 1
-        self.results[self.game_id][alg]['exec_time'] = exec_time
-        self.results[self.game_id][alg]['memory_used'] = memory_used
+        moves = [(state.move.piece_id, state.move.direction) for state in result.path()[1:]]
+        self._store_result(self.game_id, self.game, alg, moves, info)
     
         print('Done')
+        return True
+
+    def _cache_key(self, game, alg):
+        return SolutionCache.make_key(game.layout, game.state.board, alg, self.search_args[alg])
+
+    def _load_cached_result(self, alg):
+        """
+        Takes the result of an algorithm on the current level from the
+        solution cache, if it's there.
+
+        Args:
+            alg (str): The algorithm.
+
+        Returns:
+            boolean: True if the result was cached.
+        """
+        if self.solution_cache is None:
+            return False
+
+        cached = self.solution_cache.get(self._cache_key(self.game, alg))
+        if cached is None:
+            return False
+
+        moves, info = cached
+        self.results[self.game_id][alg] = dict(info)
+        self.results[self.game_id][alg]['move_history'] = self.game.replay(moves).move_history
+        self.results[self.game_id][alg]['cached'] = True
+        return True
+
+    def _store_result(self, game_id, game, alg, moves, info):
+        """
+        Stores the result of a search, and saves it to the solution
+        cache.
+
+        Args:
+            game_id (str): The level searched.
+
+            game (Klotski): The game with that level loaded.
+
+            alg (str): The algorithm.
+
+            moves (list of tuples): The (piece id, direction) moves of
+            the solution.
+
+            info (dict): The search information.
+        """
+        self.results.setdefault(game_id, dict())[alg] = dict(info)
+        self.results[game_id][alg]['move_history'] = game.replay(moves).move_history
+        self.results[game_id][alg]['cached'] = False
+
+        if self.solution_cache is not None:
+            self.solution_cache.put(self._cache_key(game, alg), moves, info)
+
+    # =============================================================================
+    #                           BACKGROUND SEARCHES
+    # =============================================================================
+
+    def start_search(self, alg):
+        """
+        Starts the search algorithm on the current level in a
+        BackgroundSearch, unless its result is already known or the
+        search is already running. Searches on several levels can run
+        at the same time.
+
+        Args:
+            alg (str): Algorithm to be run.
+        """
+        search = self.searches.get((self.game_id, alg))
+        if search is not None and search.poll() == 'running':
+            return
+        if self.is_alg_ready(alg) or self._load_cached_result(alg):
+            return
+
+        self.searches[(self.game_id, alg)] = BackgroundSearch(
+            self._level_source(self.game_id), self.search_algs[alg].__name__,
+            self.search_args[alg], self.search_timeout, trace_memory=True)
+
+    def cancel_search(self, alg):
+        """
+        Cancels the background search of an algorithm on the current
+        level, if it's running.
+
+        Args:
+            alg (str): The algorithm.
+        """
+        search = self.searches.get((self.game_id, alg))
+        if search is not None:
+            search.cancel()
+
+    def cancel_all_searches(self):
+        """
+        Cancels every background search, on every level.
+        """
+        for search in self.searches.values():
+            search.cancel()
+        for search in self.hint_searches.values():
+            search.cancel()
+
+    def poll_searches(self):
+        """
+        Updates the background searches of every level, storing the
+        results of the ones that are done.
+        """
+        for (game_id, alg), search in list(self.searches.items()):
+            if search.status == 'running' and search.poll() == 'done':
+                if game_id == self.game_id:
+                    game = self.game
+                else:
+                    game = Klotski()
+                    self._read_level(game, game_id)
+                self._store_result(game_id, game, alg, search.moves, search.info)
+                del self.searches[(game_id, alg)]
+
+    def get_search_progress(self, alg):
+        """
+        Returns the progress of the background search of an algorithm
+        on the current level.
+
+        Args:
+            alg (str): The algorithm.
+
+        Returns:
+            dict: The status, nodes expanded, frontier size, elapsed
+            seconds and error message of the search, or None if there's
+            no search of the algorithm pending or failed.
+        """
+        self.poll_searches()
+        search = self.searches.get((self.game_id, alg))
+        if search is None:
+            return None
+        return search.get_progress()
+
+    def get_best_solution(self, alg):
+        """
+        Returns the best solution found so far by an algorithm on the
+        current level: its final result once it's done, or the latest
+        one sent by a background anytime search still refining it.
+
+        Args:
+            alg (str): The algorithm.
+
+        Returns:
+            dict: The amount of moves, the proven suboptimality bound
+            (None if the algorithm gives none), the move history and
+            whether the search is done, or None if there's no solution
+            yet.
+        """
+        if self.is_alg_ready(alg):
+            result = self.results[self.game_id][alg]
+            return {
+                'n_moves': result['n_moves'],
+                'bound': result.get('solution_bound'),
+                'move_history': result['move_history'],
+                'done': True,
+            }
+
+        search = self.searches.get((self.game_id, alg))
+        if search is None or search.best_moves is None:
+            return None
+        return {
+            'n_moves': len(search.best_moves),
+            'bound': search.best_bound,
+            'move_history': self.game.replay(search.best_moves).move_history,
+            'done': False,
+        }
+
+    def request_hint(self):
+        """
+        Asks for the optimal move from the board displayed, shown by
+        get_hint until another level is loaded. The StateSpace the hints
+        are taken from is built in a BackgroundSearch the first time a
+        level asks for one, so the interface never waits on it.
+        """
+        self.hint_requested = True
+        search = self.hint_searches.get(self.game_id)
+        if search is not None and search.poll() == 'running':
+            return
+        if self.game.has_state_space():
+            self.hint_searches.pop(self.game_id, None)
+            return
+
+        self.hint_searches[self.game_id] = BackgroundSearch(
+            self._level_source(self.game_id), 'state_space_search', (), self.search_timeout)
+
+    def get_hint(self):
+        """
+        Gets the optimal move from the board currently displayed, once
+        a hint was requested.
+
+        Returns:
+            dict: The status: 'ready', or the one of the BackgroundSearch
+            still building the state space. When ready, the id matrix
+            after the move (None if there's no move to be done) and the
+            amount of moves left from it; otherwise, the error of the
+            search, if any. None if no hint was requested.
+        """
+        if not self.hint_requested:
+            return None
+
+        search = self.hint_searches.get(self.game_id)
+        if search is not None:
+            if search.poll() != 'done':
+                return {'status': search.status, 'error': search.error}
+            del self.hint_searches[self.game_id]
+
+        if self.currently_playing_result:
+            board = self.move_history[self.move_i]
+        else:
+            board = self.game.get_id_matrix()
+
+        # the displayed board only changes once per play interval
+        key = tuple(map(tuple, board))
+        if self._last_hint is None or self._last_hint[0] != key:
+            hint = self.game.get_hint(board)
+            if hint is None:
+                hint = {'status': 'ready', 'board': None, 'n_moves': 0}
+            else:
+                hint = {'status': 'ready', 'board': hint[0], 'n_moves': hint[1]}
+            self._last_hint = key, hint
+        return self._last_hint[1]
 
     def get_results(self, alg):
         """
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+from time import time
+
+from model.board_layout import BoardLayout
+
+
+class SolutionCache:
+    """
+    Persistent cache of search results, kept in a SQLite file so it
+    survives restarts. Entries are keyed by a hash of the parsed board
+    and goals, the algorithm name and its arguments, so editing a
+    board file or changing the weights never returns a stale result.
+    Solutions are stored as their moves, two bytes each (piece id + 1
+    and direction), and once the stored moves go over the size limit
+    the least recently used entries are evicted.
+    """
+
+    default_path = 'cache/solutions.sqlite3'
+
+    def __init__(self, path=None, max_bytes=16 * 2**20):
+        """
+        Args:
+            path (str, optional): Path of the SQLite file. Defaults to
+            None, for default_path.
+
+            max_bytes (int, optional): Maximum total size of the stored
+            moves. Defaults to 16MB.
+        """
+        self.path = path or self.default_path
+        self.max_bytes = max_bytes
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            '''CREATE TABLE IF NOT EXISTS solutions (
+                key TEXT PRIMARY KEY,
+                moves BLOB,
+                info TEXT,
+                size INTEGER,
+                last_used REAL
+            )''')
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(layout, board, alg, args):
+        """
+        Builds the cache key of a search.
+
+        Args:
+            layout (BoardLayout): The geometry and goals of the level.
+
+            board (bytes): The encoded initial board.
+
+            alg (str): The algorithm name.
+
+            args (tuple): The arguments the algorithm is called with.
+
+        Returns:
+            str: The key.
+        """
+        description = repr((layout.n_rows, layout.n_cols, sorted(layout.goals), board, alg, tuple(args)))
+        return hashlib.sha1(description.encode()).hexdigest()
+
+    @staticmethod
+    def encode_moves(moves):
+        """
+        Converts a list of (piece id, direction) moves into bytes.
+        """
+        directions = BoardLayout.possible_directions
+        return b''.join(bytes((piece_id + 1, directions.index(direction))) for piece_id, direction in moves)
+
+    @staticmethod
+    def decode_moves(data):
+        """
+        Converts bytes made by encode_moves back into (piece id,
+        direction) tuples.
+        """
+        directions = BoardLayout.possible_directions
+        return [(data[i] - 1, directions[data[i + 1]]) for i in range(0, len(data), 2)]
+
+    def get(self, key):
+        """
+        Looks up a search result, marking it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple: The list of (piece id, direction) moves and the dict
+            of result information, or None if not cached.
+        """
+        row = self.connection.execute(
+            'SELECT moves, info FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        self.connection.execute('UPDATE solutions SET last_used = ? WHERE key = ?', (time(), key))
+        self.connection.commit()
+        return self.decode_moves(row[0]), json.loads(row[1])
+
+    def put(self, key, moves, info):
+        """
+        Stores a search result, evicting the least recently used ones
+        if the size limit is exceeded.
+
+        Args:
+            key (str): The cache key.
+
+            moves (list of tuples): The (piece id, direction) moves of
+            the solution.
+
+            info (dict): JSON serializable information of the result.
+        """
+        data = self.encode_moves(moves)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)',
+            (key, data, json.dumps(info), len(data), time()))
+
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM solutions').fetchone()[0]
+        while total > self.max_bytes:
+            oldest, size = self.connection.execute(
+                'SELECT key, size FROM solutions ORDER BY last_used LIMIT 1').fetchone()
+            if oldest == key:
+                break
+            self.connection.execute('DELETE FROM solutions WHERE key = ?', (oldest,))
+            total -= size
+
+        self.connection.commit()
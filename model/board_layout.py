@@ -0,0 +1,105 @@
+class BoardLayout:
+    """
+    The fixed geometry of a level, shared by every KlotskiState of
+    that level. Boards are encoded as immutable bytes objects with
+    one byte per cell in row-major order, each byte holding the
+    piece id plus one, so empty squares are 0 and the red piece
+    is 1. The adjascent cells are looked up in precomputed index
+    tables instead of through pointers between cell objects.
+    """
+
+    EMPTY = 0
+    RED = 1
+
+    possible_directions = ('up', 'left', 'down', 'right')
+    direction_sums = {
+        'up': (-1, 0),
+        'left': (0, -1),
+        'down': (1, 0),
+        'right': (0, 1)
+    }
+
+    def __init__(self, n_rows, n_cols, goals):
+        """
+        Args:
+            n_rows (int): Number of rows of the board.
+
+            n_cols (int): Number of columns of the board.
+
+            goals (array of 2D tuples): List made out of (row, col)
+            tuples with the red square's end goal.
+        """
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.size = n_rows * n_cols
+        self.max_row = n_rows - 1
+        self.max_col = n_cols - 1
+
+        self.goals = goals
+        self.goal_indexes = tuple(self.index(row, col) for row, col in goals)
+
+        # (row, col) of every cell index
+        self.coords = tuple(divmod(i, n_cols) for i in range(self.size))
+
+        # neighbors[direction][index] is the index of the adjascent cell
+        # in that direction, or -1 if it falls outside the board
+        self.neighbors = dict()
+        for dir in self.possible_directions:
+            row_sum, col_sum = self.direction_sums[dir]
+            table = []
+            for row, col in self.coords:
+                n_row, n_col = row + row_sum, col + col_sum
+                if 0 <= n_row <= self.max_row and 0 <= n_col <= self.max_col:
+                    table.append(self.index(n_row, n_col))
+                else:
+                    table.append(-1)
+            self.neighbors[dir] = tuple(table)
+
+        # how much a cell index changes when moved in a direction
+        self.offsets = {
+            dir: row_sum * n_cols + col_sum
+            for dir, (row_sum, col_sum) in self.direction_sums.items()
+        }
+
+    def index(self, row, col):
+        """
+        Converts a (row, col) position into a cell index.
+        """
+        return row * self.n_cols + col
+
+    def encode(self, id_matrix):
+        """
+        Converts an id matrix into the compact board encoding.
+
+        Args:
+            id_matrix (int matrix): Cell id matrix, with -1 for the
+            empty squares.
+
+        Returns:
+            bytes: The encoded board.
+        """
+        if len(id_matrix) != self.n_rows or any(len(row) != self.n_cols for row in id_matrix):
+            raise Exception('Board does not match the layout dimensions')
+
+        return bytes(cell + 1 for row in id_matrix for cell in row)
+
+    def decode(self, board):
+        """
+        Converts an encoded board back into an id matrix.
+
+        Args:
+            board (bytes): The encoded board.
+
+        Returns:
+            int matrix: Cell id matrix, with -1 for the empty squares.
+        """
+        return [[cell - 1 for cell in board[i:i+self.n_cols]]
+                for i in range(0, self.size, self.n_cols)]
+
+    def are_adjascent(self, index0, index1):
+        """
+        Checks if two cells share a side.
+        """
+        row0, col0 = self.coords[index0]
+        row1, col1 = self.coords[index1]
+        return abs(row0 - row1) + abs(col0 - col1) == 1
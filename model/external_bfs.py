@@ -0,0 +1,255 @@
+import heapq
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+
+from model.board_layout import BoardLayout
+from model.instrumentation import NullInstrumentation
+from model.klotski_state import KlotskiState
+from model.visited_set import VisitedSet
+
+
+class ExternalBFS:
+    """
+    Breadth first search that keeps its layers on disk instead of in
+    memory, for state spaces too large for an in-memory visited set.
+
+    Each state is stored as a fixed size record made of its canonical
+    key followed by its board. While a layer is expanded, the children
+    are collected in a buffer that is sorted and written as a run file
+    whenever it fills the memory budget. The runs are then merged into
+    the next layer file, dropping the repeated keys and the keys found
+    in the current and previous layers: as every move can be undone,
+    those are the only layers a child can have been seen in. Layer
+    files are read through memory maps, and are binary searched by key
+    to rebuild the path backwards once a final state is found.
+    """
+
+    work_folder = 'cache/external_bfs/'
+
+    def __init__(self, root, max_memory=64 * 2**20, work_folder=None, instrumentation=None, progress=None):
+        """
+        Args:
+            root (KlotskiState): The initial state.
+
+            max_memory (int, optional): Maximum memory of the buffer of
+            children, in bytes. Defaults to 64MB.
+
+            work_folder (str, optional): Folder where the search files
+            are made, and removed at the end. Defaults to None, for the
+            class' work_folder.
+
+            instrumentation (NullInstrumentation, optional): Gets the
+            children generation, the nodes deduplicated while merging
+            and the frontier size, after each layer. Defaults to None,
+            for none.
+
+            progress (function, optional): Called after each layer with
+            the nodes expanded and the frontier size, as the progress
+            callback of Klotski. Defaults to None.
+        """
+        self.root = root
+        self.catalog = root.catalog
+        self.key = VisitedSet(root).key
+        self.key_size = self.catalog.layout.size
+        self.record_size = 2 * self.key_size
+        if work_folder is not None:
+            self.work_folder = work_folder
+        self.instrumentation = instrumentation or NullInstrumentation()
+        self.progress = progress
+
+        # a record in the buffer is a bytes object plus its list slot
+        record_memory = sys.getsizeof(bytes(self.record_size)) + 8
+        self.buffer_size = max(max_memory // record_memory, 1)
+
+        self.expanded_nodes = 0
+        self.layer_sizes = []
+
+    def _record(self, state):
+        return self.key(state).to_bytes(self.key_size, 'big') + state.board
+
+    def _layer_path(self, depth):
+        return os.path.join(self.folder, f'layer{depth}.bin')
+
+    def _read(self, file_path):
+        """
+        Iterates over the records of a file.
+        """
+        if os.path.getsize(file_path) == 0:
+            return
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = self.record_size
+            for start in range(0, len(data), size):
+                yield data[start:start + size]
+
+    def _write_run(self, buffer, n_runs):
+        """
+        Sorts a buffer of records and writes it as a run file.
+
+        Returns:
+            str: The path of the run.
+        """
+        buffer.sort()
+        path = os.path.join(self.folder, f'run{n_runs}.bin')
+        with open(path, 'wb') as f:
+            f.write(b''.join(buffer))
+        buffer.clear()
+        return path
+
+    def run(self):
+        """
+        Runs the search.
+
+        Returns:
+            KlotskiState: A final state of the game, with the least
+            amount of moves.
+        """
+        root = self.root
+        self.expanded_nodes = 0
+        self.layer_sizes = [1]
+        if root.is_complete():
+            return root
+
+        os.makedirs(self.work_folder, exist_ok=True)
+        self.folder = tempfile.mkdtemp(dir=self.work_folder)
+        try:
+            with open(self._layer_path(0), 'wb') as f:
+                f.write(self._record(root))
+            with open(self._layer_path(-1), 'wb'):
+                pass
+
+            depth = 0
+            while True:
+                goal = self._expand_layer(depth)
+                depth += 1
+                if goal is not None:
+                    return self._rebuild_path(goal, depth)
+                if self.layer_sizes[-1] == 0:
+                    return None
+        finally:
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _expand_layer(self, depth):
+        """
+        Builds the file of the layer after the given one.
+
+        Returns:
+            bytes: The board of a final state in the new layer, or None.
+        """
+        catalog = self.catalog
+        children = self.instrumentation.children(KlotskiState.children)
+        buffer = []
+        runs = []
+        n_children = 0
+        for record in self._read(self._layer_path(depth)):
+            self.expanded_nodes += 1
+            # states are made without a parent so no move is skipped
+            for child in children(KlotskiState(record[self.key_size:], catalog)):
+                n_children += 1
+                buffer.append(self._record(child))
+                if len(buffer) >= self.buffer_size:
+                    runs.append(self._write_run(buffer, len(runs)))
+        if buffer:
+            runs.append(self._write_run(buffer, len(runs)))
+
+        # the sorted runs are merged skipping repeated keys and the keys
+        # of the current and previous layers
+        key_size = self.key_size
+        seen = [self._read(self._layer_path(depth)), self._read(self._layer_path(depth - 1))]
+        seen_keys = [next(records, None) for records in seen]
+        last_key = None
+        goal = None
+        size = 0
+        goal_indexes = catalog.layout.goal_indexes
+        red = BoardLayout.RED
+        with open(self._layer_path(depth + 1), 'wb') as f:
+            for record in heapq.merge(*(self._read(run) for run in runs)):
+                key = record[:key_size]
+                if key == last_key:
+                    continue
+                last_key = key
+
+                duplicate = False
+                for i, records in enumerate(seen):
+                    while seen_keys[i] is not None and seen_keys[i][:key_size] < key:
+                        seen_keys[i] = next(records, None)
+                    if seen_keys[i] is not None and seen_keys[i][:key_size] == key:
+                        duplicate = True
+                if duplicate:
+                    continue
+
+                f.write(record)
+                size += 1
+                if goal is None and all(record[key_size + g] == red for g in goal_indexes):
+                    goal = record[key_size:]
+
+        for run in runs:
+            os.remove(run)
+        # the previous layer isn't needed to find duplicates anymore,
+        # but it's kept to rebuild the path
+        self.layer_sizes.append(size)
+
+        self.instrumentation.count('deduplicated', n_children - size)
+        self.instrumentation.sample(self.expanded_nodes, size)
+        if self.progress is not None:
+            self.progress(self.expanded_nodes, size)
+        return goal
+
+    def _find(self, depth, key):
+        """
+        Binary searches a layer file for a key.
+
+        Returns:
+            bytes: The board stored with the key, or None.
+        """
+        path = self._layer_path(depth)
+        if os.path.getsize(path) == 0:
+            return None
+        size = self.record_size
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            low, high = 0, len(data) // size
+            while low < high:
+                middle = (low + high) // 2
+                record_key = data[middle * size:middle * size + self.key_size]
+                if record_key < key:
+                    low = middle + 1
+                elif record_key > key:
+                    high = middle
+                else:
+                    return data[middle * size + self.key_size:(middle + 1) * size]
+        return None
+
+    def _rebuild_path(self, goal, depth):
+        """
+        Walks back from the final board, finding on each layer a board
+        adjacent to the last one found, then replays the moves from
+        the initial state so the result has its usual parent references.
+
+        Args:
+            goal (bytes): The final board found.
+
+            depth (int): The layer of the final board.
+
+        Returns:
+            KlotskiState: The final state.
+        """
+        keys = [self.key(KlotskiState(goal, self.catalog))]
+        board = goal
+        for d in range(depth - 1, 0, -1):
+            for child in KlotskiState(board, self.catalog).children():
+                key = self.key(child)
+                found = self._find(d, key.to_bytes(self.key_size, 'big'))
+                if found is not None:
+                    board = found
+                    keys.append(key)
+                    break
+        keys.reverse()
+
+        # the boards found may be relabeled or mirrored versions of the
+        # ones reached from the initial state, so they're matched by key
+        state = self.root
+        for key in keys:
+            state = next(child for child in state.children() if self.key(child) == key)
+        return state
@@ -0,0 +1,360 @@
+from collections import deque
+import hashlib
+from itertools import combinations
+import os
+import pickle
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from model.board_layout import BoardLayout
+
+
+class HeuristicTables:
+    """
+    Per level lookup tables with the heuristic terms of every red
+    piece position, and of every empty cell for each of them, so that
+    evaluating a state takes a handful of lookups instead of looping
+    over the red squares and the goals.
+    """
+
+    def __init__(self, catalog):
+        """
+        Args:
+            catalog (PieceCatalog): The pieces and geometry of the level.
+        """
+        layout = catalog.layout
+        coords = layout.coords
+        goals = layout.goals
+        goal_indexes = set(layout.goal_indexes)
+        red_cells = catalog.cells[BoardLayout.RED]
+
+        # anchors at which the red piece covers every goal
+        self.goal_anchors = tuple(
+            anchor for anchor, cells in enumerate(red_cells)
+            if cells is not None and goal_indexes.issubset(cells))
+
+        self.manhattan = [None] * layout.size
+        self.lower_bound = [None] * layout.size
+        self.zeros_empty = [None] * layout.size
+        self.inbetween = [None] * layout.size
+        for anchor, cells in enumerate(red_cells):
+            if cells is None:
+                continue
+            row, col = coords[anchor]
+            zeros = [coords[z] for z in cells]
+
+            # distance of the top-left most red square to the top-left
+            # most goal
+            self.manhattan[anchor] = abs(row - goals[0][0]) + abs(col - goals[0][1])
+
+            # every move shifts the red piece by at most one square
+            self.lower_bound[anchor] = min(
+                [abs(row - coords[g][0]) + abs(col - coords[g][1]) for g in self.goal_anchors],
+                default=0)
+
+            self.zeros_empty[anchor] = tuple(
+                min([abs(z[0] - e_row) + abs(z[1] - e_col) for z in zeros]) - 1
+                for e_row, e_col in coords)
+
+            self.inbetween[anchor] = tuple(
+                int(any([e_row == z[0] == o[0] or e_col == z[1] == o[1]
+                         for z in zeros for o in goals]))
+                for e_row, e_col in coords)
+
+
+def admissible_heuristic(state):
+    """
+    Lower bound on the amount of moves left: the manhattan distance
+    from the red piece to the closest position where it covers all
+    of the goals.
+
+    Args:
+        state (KlotskiState): The state to be evaluated.
+
+    Returns:
+        int: Heuristic value.
+    """
+    return state.catalog.heuristic_tables.lower_bound[state.anchors[BoardLayout.RED]]
+
+
+class WeightedHeuristic:
+    """
+    The weighted sum of KlotskiState.heuristic with its terms folded
+    into two tables: the weighted manhattan distance of each red
+    anchor, and for each red anchor the weighted cost of an empty
+    square in each cell. A state is then evaluated with one lookup
+    plus one per empty square.
+
+    Batches of states, such as the children of an expansion or a
+    whole search layer, can be evaluated at once. When NumPy is
+    installed, large batches are evaluated with vectorized indexing
+    of the tables; small ones, where the array conversion costs more
+    than it saves, and every batch without NumPy, use the same
+    lookups one state at a time.
+    """
+
+    # smallest batch evaluated with NumPy
+    numpy_threshold = 64
+
+    def __init__(self, catalog, manhattan_multi, zeros_empty_multi, inbet_multi):
+        """
+        Args:
+            catalog (PieceCatalog): The pieces and geometry of the level.
+
+            manhattan_multi (float): Weight for the manhattan distance.
+
+            zeros_empty_multi (float): Weight for the distance between
+            the red piece and the empty squares.
+
+            inbet_multi (float): Weight for the check if the the empty
+            squares are between the red piece and the goals.
+        """
+        tables = catalog.heuristic_tables
+        size = catalog.layout.size
+
+        self.base = [0] * size
+        self.cells = [(0,) * size] * size
+        for anchor in range(size):
+            if tables.manhattan[anchor] is None:
+                continue
+            self.base[anchor] = manhattan_multi * tables.manhattan[anchor]
+            self.cells[anchor] = tuple(
+                zeros_empty_multi * z + inbet_multi * i
+                for z, i in zip(tables.zeros_empty[anchor], tables.inbetween[anchor]))
+
+        if numpy is not None:
+            self.base_array = numpy.array(self.base)
+            self.cells_array = numpy.array(self.cells)
+
+    def __call__(self, state):
+        """
+        Evaluates a single state.
+
+        Args:
+            state (KlotskiState): The state to be evaluated.
+
+        Returns:
+            float: Heuristic value, the same as KlotskiState.heuristic
+            with the weights of this instance.
+        """
+        anchor = state.anchors[BoardLayout.RED]
+        cells = self.cells[anchor]
+        return self.base[anchor] + sum([cells[e] for e in state.empties])
+
+    def evaluate_batch(self, states):
+        """
+        Evaluates several states at once.
+
+        Args:
+            states (list of KlotskiState): The states to be evaluated.
+
+        Returns:
+            list of float: Heuristic value of each state.
+        """
+        if numpy is None or len(states) < self.numpy_threshold:
+            return [self(state) for state in states]
+
+        red = BoardLayout.RED
+        anchors = numpy.array([state.anchors[red] for state in states])
+        empties = numpy.array([state.empties for state in states])
+        values = self.base_array[anchors] + self.cells_array[anchors[:, None], empties].sum(axis=1)
+        return values.tolist()
+
+
+class PatternDatabase:
+    """
+    Exact distances to the goal in an abstraction of the level that
+    keeps only the red piece and the empty squares, every other square
+    being just filled. The abstraction has the red piece moves plus,
+    for each direction, the moves in which any set of empty squares
+    jump that way over a line of filled squares, up to the longest
+    line a piece has along that direction. Every real move is one of
+    these, so the distances are an admissible and consistent bound.
+
+    The database is built by a breadth first search from the abstract
+    goals, and as it only depends on the board size, the red piece,
+    the goals, the amount of empty squares and the pieces lengths,
+    it's cached on disk under a hash of those.
+    """
+
+    cache_folder = 'cache/pdb/'
+
+    def __init__(self, catalog, cache_folder=None):
+        """
+        Args:
+            catalog (PieceCatalog): The pieces and geometry of the level.
+
+            cache_folder (str, optional): Folder of the cached databases.
+            Defaults to None, for the class' cache_folder.
+        """
+        if cache_folder is not None:
+            self.cache_folder = cache_folder
+
+        self.catalog = catalog
+        self.layout = catalog.layout
+
+        # longest line of squares of a non-red piece along each axis
+        self.max_jump = {'up': 0, 'left': 0, 'down': 0, 'right': 0}
+        for code in catalog.codes:
+            if code == BoardLayout.RED:
+                continue
+            shape = set(catalog.shapes[code])
+            for dir in ('down', 'right'):
+                row_sum, col_sum = self.layout.direction_sums[dir]
+                for row, col in shape:
+                    if (row - row_sum, col - col_sum) in shape:
+                        continue
+                    length = 1
+                    while (row + length * row_sum, col + length * col_sum) in shape:
+                        length += 1
+                    self.max_jump[dir] = max(self.max_jump[dir], length)
+        self.max_jump['up'] = self.max_jump['down']
+        self.max_jump['left'] = self.max_jump['right']
+
+        self.distances = self._load_or_build()
+
+    def _cache_path(self):
+        """
+        Path of the cache file of this level's database.
+        """
+        red = self.catalog.shapes[BoardLayout.RED]
+        description = repr((self.layout.n_rows, self.layout.n_cols, sorted(self.layout.goals), red,
+                            self.catalog.n_empties, sorted(self.max_jump.items())))
+        digest = hashlib.sha1(description.encode()).hexdigest()
+        return os.path.join(self.cache_folder, f'{digest}.pdb')
+
+    def _load_or_build(self):
+        """
+        Loads the database from the cache, building and saving it if it
+        isn't there.
+
+        Returns:
+            dict: Distance of each abstract state key.
+        """
+        path = self._cache_path()
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+        distances = self._build()
+        os.makedirs(self.cache_folder, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(distances, f)
+        return distances
+
+    def key(self, red_anchor, empties):
+        """
+        Key of an abstract state.
+
+        Args:
+            red_anchor (int): Anchor of the red piece.
+
+            empties (iterable of int): Indexes of the empty cells.
+
+        Returns:
+            int: The red anchor followed by the bitmask of the empties.
+        """
+        mask = 0
+        for e in empties:
+            mask |= 1 << e
+        return (red_anchor << self.layout.size) | mask
+
+    def _abstract_goals(self):
+        """
+        Every abstract state with the red piece over the goals.
+        """
+        n_empties = self.catalog.n_empties
+        red_cells = self.catalog.cells[BoardLayout.RED]
+
+        for anchor in self.catalog.heuristic_tables.goal_anchors:
+            free = [c for c in range(self.layout.size) if c not in red_cells[anchor]]
+            for empties in combinations(free, n_empties):
+                yield anchor, empties
+
+    def _neighbors(self, red_anchor, empties):
+        """
+        Abstract states reachable in one move.
+
+        Args:
+            red_anchor (int): Anchor of the red piece.
+
+            empties (frozenset of int): Indexes of the empty cells.
+
+        Yields:
+            tuple: Red anchor and empties of each reachable state.
+        """
+        layout = self.layout
+        red_cells = self.catalog.cells[BoardLayout.RED][red_anchor]
+
+        for dir, entry in self.catalog.moves[BoardLayout.RED][red_anchor].items():
+            new_anchor, required, vacated = entry
+            if all(c in empties for c in required):
+                yield new_anchor, (empties - set(required)) | set(vacated)
+
+        for dir in layout.possible_directions:
+            steps = layout.neighbors[dir]
+            # the cells each empty square can jump to in this direction
+            jumps = []
+            for e in empties:
+                targets = []
+                cell = e
+                for _ in range(self.max_jump[dir]):
+                    cell = steps[cell]
+                    if cell < 0 or cell in empties or cell in red_cells:
+                        break
+                    targets.append(cell)
+                if targets:
+                    jumps.append((e, targets))
+
+            # any non empty set of the empty squares can jump at once
+            def combine(i, current):
+                if i == len(jumps):
+                    if current != empties:
+                        yield current
+                    return
+                yield from combine(i + 1, current)
+                e, targets = jumps[i]
+                for target in targets:
+                    yield from combine(i + 1, (current - {e}) | {target})
+
+            for new_empties in combine(0, empties):
+                yield red_anchor, new_empties
+
+    def _build(self):
+        """
+        Breadth first search from every abstract goal.
+
+        Returns:
+            dict: Distance of each abstract state key.
+        """
+        distances = dict()
+        queue = deque()
+        for anchor, empties in self._abstract_goals():
+            distances[self.key(anchor, empties)] = 0
+            queue.append((anchor, frozenset(empties)))
+
+        while queue:
+            anchor, empties = queue.popleft()
+            distance = distances[self.key(anchor, empties)] + 1
+            for new_anchor, new_empties in self._neighbors(anchor, empties):
+                key = self.key(new_anchor, new_empties)
+                if key not in distances:
+                    distances[key] = distance
+                    queue.append((new_anchor, frozenset(new_empties)))
+
+        return distances
+
+    def lookup(self, state):
+        """
+        Distance of a state's abstraction to the goal.
+
+        Args:
+            state (KlotskiState): The state to be evaluated.
+
+        Returns:
+            int: Heuristic value, infinite if the goal can't be reached.
+        """
+        return self.distances.get(self.key(state.anchors[BoardLayout.RED], state.empties), float('inf'))
@@ -0,0 +1,242 @@
+from time import perf_counter
+
+
+class NullInstrumentation:
+    """
+    The instrumentation used when none is wanted. The searches get
+    their hot functions (children generation, heuristic, visited set
+    lookups, open list pushes) through the methods of their
+    instrumentation, which here hand them back untouched, so turning it
+    off costs nothing inside the search loops.
+    """
+
+    enabled = False
+
+    def begin(self, search):
+        """
+        Called when a search starts.
+
+        Args:
+            search (str): Name of the search.
+        """
+        pass
+
+    def end(self, expanded_nodes):
+        """
+        Called when the current search ends.
+
+        Args:
+            expanded_nodes (int): Nodes the search expanded.
+        """
+        pass
+
+    def sample(self, expanded_nodes, frontier_size):
+        """
+        Called every Klotski.progress_interval expansions with the
+        current frontier size.
+        """
+        pass
+
+    def timed(self, phase, func):
+        """
+        Returns the function a search should call instead of func, for
+        the time spent in it to be added to the phase.
+        """
+        return func
+
+    def children(self, func):
+        """
+        Same as timed, for the successor generation, also counting the
+        generated nodes. Works on KlotskiState.children and on the lazy
+        KlotskiState.successors.
+        """
+        return func
+
+    def heuristic(self, func):
+        """
+        Same as timed, for the heuristic.
+        """
+        return func
+
+    def visited_add(self, func):
+        """
+        Same as timed, for a visited set insertion, which returns False
+        for a duplicate state.
+        """
+        return func
+
+    def visited_contains(self, func):
+        """
+        Same as timed, for a visited set membership test, which returns
+        True for a duplicate state.
+        """
+        return func
+
+    def open_push(self, func):
+        """
+        Same as timed, for OpenList.push_batch, which returns the amount
+        of nodes added; the others are duplicates.
+        """
+        return func
+
+    def count(self, counter, amount):
+        """
+        Adds to a node counter ('generated' or 'deduplicated') of the
+        current search, for the searches that find their nodes in other
+        processes or on disk instead of through the wrapped functions.
+        """
+        pass
+
+
+class SearchInstrumentation(NullInstrumentation):
+    """
+    Collects, for every search run while it's set as the instrumentation
+    of a Klotski: the nodes generated, expanded and deduplicated, the
+    time spent generating children, evaluating the heuristic and
+    looking up the visited set, and the frontier size over time.
+
+    The phase timings can be exported as collapsed stacks
+    ("search;phase microseconds" lines), the input of flamegraph.pl
+    and of speedscope.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        # one record per search run
+        self.records = []
+        self.current = None
+
+    def begin(self, search):
+        self.current = {
+            'search': search,
+            'time': 0,
+            'expanded': 0,
+            'generated': 0,
+            'deduplicated': 0,
+            'phases': dict(),
+            # (seconds since the start, expanded nodes, frontier size)
+            'frontier_samples': [],
+        }
+        self.start_time = perf_counter()
+        self.records.append(self.current)
+
+    def end(self, expanded_nodes):
+        self.current['time'] = perf_counter() - self.start_time
+        self.current['expanded'] = expanded_nodes
+        self.current = None
+
+    def sample(self, expanded_nodes, frontier_size):
+        if self.current is not None:
+            self.current['frontier_samples'].append(
+                (perf_counter() - self.start_time, expanded_nodes, frontier_size))
+
+    def _add_time(self, phase, elapsed):
+        phases = self.current['phases']
+        phases[phase] = phases.get(phase, 0) + elapsed
+
+    def timed(self, phase, func):
+        def wrapper(*args):
+            start = perf_counter()
+            result = func(*args)
+            self._add_time(phase, perf_counter() - start)
+            return result
+        return wrapper
+
+    def children(self, func):
+        def wrapper(*args):
+            start = perf_counter()
+            result = func(*args)
+            self._add_time('children', perf_counter() - start)
+            if isinstance(result, list):
+                self.current['generated'] += len(result)
+                return result
+            return self._counted(result)
+        return wrapper
+
+    def _counted(self, successors):
+        """
+        Times and counts the states of a lazy successor iterator as they
+        are created.
+        """
+        while True:
+            start = perf_counter()
+            child = next(successors, None)
+            self._add_time('children', perf_counter() - start)
+            if child is None:
+                return
+            self.current['generated'] += 1
+            yield child
+
+    def heuristic(self, func):
+        return self.timed('heuristic', func)
+
+    def visited_add(self, func):
+        def wrapper(*args):
+            start = perf_counter()
+            result = func(*args)
+            self._add_time('visited', perf_counter() - start)
+            if not result:
+                self.current['deduplicated'] += 1
+            return result
+        return wrapper
+
+    def visited_contains(self, func):
+        def wrapper(*args):
+            start = perf_counter()
+            result = func(*args)
+            self._add_time('visited', perf_counter() - start)
+            if result:
+                self.current['deduplicated'] += 1
+            return result
+        return wrapper
+
+    def open_push(self, func):
+        def wrapper(nodes, *args):
+            start = perf_counter()
+            result = func(nodes, *args)
+            self._add_time('open_list', perf_counter() - start)
+            self.current['deduplicated'] += len(nodes) - result
+            return result
+        return wrapper
+
+    def count(self, counter, amount):
+        if self.current is not None:
+            self.current[counter] += amount
+
+    def get_report(self):
+        """
+        Returns:
+            list of dict: The record of each search run, with its name,
+            total time, node counters, time by phase and frontier
+            samples.
+        """
+        return self.records
+
+    def collapsed_stacks(self):
+        """
+        The phase timings of every search run, summed by search, as
+        collapsed stacks in microseconds. The time not spent in any
+        phase is attributed to the search itself.
+
+        Returns:
+            list of str: The lines of the collapsed stacks.
+        """
+        totals = dict()
+        for record in self.records:
+            search = record['search']
+            phase_time = 0
+            for phase, elapsed in record['phases'].items():
+                stack = f'{search};{phase}'
+                totals[stack] = totals.get(stack, 0) + elapsed
+                phase_time += elapsed
+            totals[search] = totals.get(search, 0) + max(record['time'] - phase_time, 0)
+
+        return [f'{stack} {round(elapsed * 1e6)}' for stack, elapsed in sorted(totals.items())]
+
+    def export_collapsed(self, file_path):
+        """
+        Writes the collapsed stacks to a file.
+        """
+        with open(file_path, 'w') as f:
+            f.write('\n'.join(self.collapsed_stacks()) + '\n')
@@ -1,11 +1,37 @@
-from copy import deepcopy
 from collections import deque
-import heapq
+from functools import wraps
+import os
 from time import time
 
-from model.board_cell import BoardCell
+from model.board_layout import BoardLayout
+from model.external_bfs import ExternalBFS
+from model.heuristics import PatternDatabase, WeightedHeuristic, admissible_heuristic
+from model.instrumentation import NullInstrumentation
 from model.klotski_state import KlotskiState
-from model.trie import Trie
+from model.level_pack import InvalidLevel, validate_level
+from model.move import Move
+from model.open_list import OpenList
+from model.parallel_bfs import ParallelBFS
+from model.piece_catalog import PieceCatalog
+from model.search_budget import SearchBudget
+from model.state_space import StateSpace
+from model.transposition_table import TranspositionTable
+from model.visited_set import VisitedMap, VisitedSet
+
+
+def _instrumented(search):
+    """
+    Decorator of the search methods, telling the Klotski's
+    instrumentation when each search begins and ends.
+    """
+    @wraps(search)
+    def wrapper(self, *args, **kwargs):
+        self.instrumentation.begin(search.__name__)
+        try:
+            return search(self, *args, **kwargs)
+        finally:
+            self.instrumentation.end(self.expanded_nodes)
+    return wrapper
     
 
 class Klotski:
@@ -14,8 +40,33 @@ class Klotski:
     algorithms.
     """
 
+    # expansions between calls to the progress callback
+    progress_interval = 1024
+
     def __init__(self):
-        pass   
+        # visited set and expanded nodes of the last search, kept to
+        # report them
+        self.visited = None
+        self.expanded_nodes = 0
+
+        # function called with the expanded nodes and the frontier size
+        # every progress_interval expansions of a search, if set
+        self.progress = None
+
+        # function called with each better solution found by the
+        # anytime search and its suboptimality bound, if set
+        self.improvement = None
+        # proven bound on how many times longer than optimal the result
+        # of the last weighted or anytime search is
+        self.solution_bound = None
+
+        # receives the counters and timings of the searches; see
+        # SearchInstrumentation
+        self.instrumentation = NullInstrumentation()
+
+        # distance table of the current level, loaded on the first hint
+        # once state_space_search has built it
+        self.state_space = None
 
     def read_board(self, file_path):
         """
@@ -24,40 +75,68 @@ class Klotski:
 
         Args:
             file_name (str): The board file path.
+
+        Raises:
+            InvalidLevel: If the file can't be parsed or the level isn't
+            valid.
         """
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-
-        proto_board = []
-        goals = []
-
-        first_line = lines[0].replace('\n', '').replace(' ', '').split(';')
-        for g in first_line:
-            g = g.split(',')
-            goals.append((int(g[0]), int(g[1])))
-        # for later usage; it helps to assure that the top-left most objective
-        # is first
-        goals = sorted(goals, key=lambda x: (x[0], x[1]))
-
-        for l in lines[1:]:
-            l = l.replace('\n', '')
-            l = l.replace('  ', ' ')
-            l = l.split(' ')
-            proto_board.append([int(cell) for cell in l])
-        
-        board = []
-        for i in range(len(proto_board)):
-            row = []
-            for j in range(len(proto_board[0])):
-                row.append(BoardCell(i, j, proto_board[i][j]))
-            board.append(row)
-        
-        for row in board:
-            for cell in row:
-                cell.late_init(board)
-        
+        self.load_level(*self._parse_board_file(file_path))
+
+    def load_level(self, goals, proto_board):
+        """
+        Sets up a level from its goals and id matrix, as they are read
+        from a board file or a LevelPack.
+
+        Args:
+            goals (list of 2D tuples): The sorted goals.
+
+            proto_board (int matrix): The piece ids, -1 for the empty
+            squares.
+
+        Raises:
+            InvalidLevel: If the level breaks the rules checked by
+            validate_level.
+        """
+        validate_level(goals, proto_board)
+
+        layout = BoardLayout(len(proto_board), len(proto_board[0]), goals)
+        board = layout.encode(proto_board)
+
         self.goals = goals
-        self.state = KlotskiState(board, goals)
+        self.layout = layout
+        self.catalog = PieceCatalog(board, layout)
+        self.state = KlotskiState(board, self.catalog)
+
+    @staticmethod
+    def _parse_board_file(file_path):
+        """
+        Parses a board file.
+
+        Args:
+            file_name (str): The board file path.
+
+        Returns:
+            tuple: The sorted goals and the id matrix of the board.
+        """
+        with open(file_path, 'r') as f:
+            lines = [l.split() for l in f if l.strip()]
+        if not lines:
+            raise InvalidLevel(f'{file_path} is empty')
+
+        try:
+            goals = []
+            for g in ''.join(lines[0]).split(';'):
+                row, col = g.split(',')
+                goals.append((int(row), int(col)))
+            # for later usage; it helps to assure that the top-left most objective
+            # is first
+            goals = sorted(goals, key=lambda x: (x[0], x[1]))
+
+            proto_board = [[int(cell) for cell in l] for l in lines[1:]]
+        except ValueError:
+            raise InvalidLevel(f'{file_path} is not a valid board file')
+
+        return goals, proto_board
 
     def get_id_matrix(self):
         """
@@ -70,71 +149,499 @@ class Klotski:
         Return the game's goals.
         """
         return self.goals
+
+    def get_visited_info(self):
+        """
+        Returns the amount of states visited by the last search and the
+        estimated memory, in bytes, its visited set used.
+        """
+        if self.visited is None:
+            return 0, 0
+        return len(self.visited), self.visited.memory_usage()
     
+    def enumerate_state_space(self, max_diameter_bfs=200):
+        """
+        Walks every configuration reachable from the level's initial
+        board, as described in StateSpace.
+
+        Args:
+            max_diameter_bfs (int, optional): Maximum amount of breadth
+            first searches run to compute the diameter. Defaults to 200.
+
+        Returns:
+            StateSpace: The reachable states with their distances to
+            the goal.
+        """
+        return StateSpace.build(self.state, max_diameter_bfs)
+
+    def has_state_space(self):
+        """
+        Whether the StateSpace of the current level is loaded or in the
+        disk cache, so that get_hint answers right away.
+        """
+        if self.state_space is not None and self.state_space.catalog is self.catalog:
+            return True
+        return os.path.exists(StateSpace.cache_path(self.state))
+
+    def state_space_search(self):
+        """
+        Optimal search that follows the StateSpace of the current level,
+        taking the best move from each state until the goal. The state
+        space is loaded from the disk cache, or built and saved there,
+        which walks every reachable state and takes seconds on the
+        larger levels: it's meant to be run in a BackgroundSearch, and
+        leaves the cache get_hint loads from.
+
+        Returns:
+            KlotskiState: A final state of the game, with the least
+            amount of moves, or None if it can't be solved.
+        """
+        if self.has_state_space():
+            self._load_state_space()
+        else:
+            self.state_space = StateSpace.load_or_build(self.state)
+
+        self.visited = None
+        self.expanded_nodes = 0
+        state = self.state
+        while not state.is_complete():
+            next_state = self.state_space.best_move(state)
+            if next_state is None:
+                return None
+            # taken from the children of state to keep the path
+            state = next(child for child in state.children() if child.board == next_state.board)
+            self.expanded_nodes += 1
+        return state
+
+    def _load_state_space(self):
+        """
+        Loads the StateSpace of the current level from the disk cache,
+        unless it's already loaded.
+        """
+        if self.state_space is None or self.state_space.catalog is not self.catalog:
+            self.state_space = StateSpace.load(StateSpace.cache_path(self.state), self.catalog)
+
+    def get_hint(self, id_matrix):
+        """
+        Finds the optimal move from a board of the current level, using
+        its StateSpace. The state space must be in the disk cache
+        already (see has_state_space), as building it takes too long to
+        be done here; state_space_search builds it.
+
+        Args:
+            id_matrix (int matrix): The board, with -1 for the empty
+            squares.
+
+        Returns:
+            tuple: The id matrix after the optimal move and the amount
+            of moves left from it, or None if the board is final or
+            can't be solved.
+        """
+        if not self.has_state_space():
+            raise Exception('The state space of the level is not built yet')
+        self._load_state_space()
+
+        state = KlotskiState(self.layout.encode(id_matrix), self.catalog)
+        next_state = self.state_space.best_move(state)
+        if next_state is None:
+            return None
+        return next_state.id_matrix, self.state_space.distance(next_state)
+
+    def _report_progress(self, frontier_size):
+        """
+        Calls the progress callback, if there's one, and samples the
+        frontier size for the instrumentation, once every
+        progress_interval expanded nodes.
+
+        Args:
+            frontier_size (int): Current amount of states waiting to be
+            expanded.
+        """
+        if self.expanded_nodes % self.progress_interval == 0:
+            self.instrumentation.sample(self.expanded_nodes, frontier_size)
+            if self.progress is not None:
+                self.progress(self.expanded_nodes, frontier_size)
+
+    def replay(self, moves):
+        """
+        Applies a sequence of moves from the initial state.
+
+        Args:
+            moves (iterable of tuples): The (piece id, direction) of
+            each move.
+
+        Returns:
+            KlotskiState: The state reached, whose parents are the
+            states along the way.
+        """
+        state = self.state
+        for piece_id, direction in moves:
+            state = state.do_move(Move(piece_id, direction))
+        return state
+
     # =============================================================================
     #                           UNINFORMED SEARCH
     # =============================================================================
 
-    def bfs(self):
+    @_instrumented
+    def bfs(self, max_nodes=None, max_memory=None):
         """
         Breadth first search.
+
+        Args:
+            max_nodes (int, optional): Maximum amount of nodes to be
+            expanded. Defaults to None, for no limit.
+
+            max_memory (int, optional): Maximum estimated memory of the
+            frontier and visited set, in bytes. Defaults to None, for
+            no limit.
+
+        Raises:
+            SearchBudgetExceeded: If a budget runs out before a final
+            state is found.
+
+        Returns:
+            KlotskiState: A final state of the game.
         """
-        queue = deque([self.state])
-        visited = Trie()
+        return self._graph_search(max_nodes, max_memory)
 
-        while queue:
-            current = queue.popleft()
-            visited.insert(self.state.id_matrix)
+    @_instrumented
+    def dfs(self, max_nodes=None, max_memory=None):
+        """
+        Depth first search. Takes the same arguments as the breadth
+        first one.
 
-            if current.is_complete():
-                return current
+        Instead of a queue of states, it keeps a stack with the lazy
+        successors of each state of the current path, so only the
+        states of the path are held, and each child is created when the
+        search gets to it. States are marked as visited when created and
+        final states are detected then too.
 
-            for child in current.children():
-                if not visited.is_in_trie(child.id_matrix):
-                    queue.append(child)
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        budget = SearchBudget(self.state, max_nodes, max_memory)
+        visited = self.visited = VisitedSet(self.state)
+        visited.add(self.state)
+        self.expanded_nodes = 0
+
+        if self.state.is_complete():
+            return self.state
+
+        successors = self.instrumentation.children(KlotskiState.successors)
+        add = self.instrumentation.visited_add(visited.add)
+
+        stack = [successors(self.state)]
+        self.expanded_nodes += 1
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            if not add(child):
+                continue
+            if child.is_complete():
+                return child
+
+            self.expanded_nodes += 1
+            budget.check(self.expanded_nodes, len(stack), visited)
+            self._report_progress(len(stack))
+            stack.append(successors(child))
 
         return None
-    
-    def dfs(self):
-        queue = deque([self.state])   # initialize the queue to store the nodes
-        visited = Trie()
-        
+
+    def _graph_search(self, max_nodes, max_memory):
+        """
+        Graph search of the BFS. States are marked as visited as soon as
+        they are enqueued, so each one enters the queue at most once,
+        and final states are detected when generated.
+
+        Args:
+            max_nodes (int): Maximum amount of nodes to be expanded, or
+            None for no limit.
+
+            max_memory (int): Maximum estimated memory, in bytes, or None
+            for no limit.
+
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        budget = SearchBudget(self.state, max_nodes, max_memory)
+        queue = deque([self.state])
+        visited = self.visited = VisitedSet(self.state)
+        visited.add(self.state)
+        self.expanded_nodes = 0
+
+        if self.state.is_complete():
+            return self.state
+
+        pop = queue.popleft
+        children = self.instrumentation.children(KlotskiState.children)
+        add = self.instrumentation.visited_add(visited.add)
         while queue:
-            current = queue.pop()
-            visited.insert(self.state.id_matrix)
+            current = pop()
+            self.expanded_nodes += 1
+            budget.check(self.expanded_nodes, len(queue), visited)
+            self._report_progress(len(queue))
 
-            if current.is_complete():
-                return current
-            
-            for child in current.children():
-                if not visited.is_in_trie(child.id_matrix):
+            for child in children(current):
+                if add(child):
+                    if child.is_complete():
+                        return child
                     queue.append(child)
-                
+
         return None
-    
-    def iterative_deepening_search(self):
+
+    @_instrumented
+    def parallel_bfs(self, n_workers=None):
+        """
+        Breadth first search with each layer expanded across a pool of
+        processes, as described in ParallelBFS.
+
+        Args:
+            n_workers (int, optional): Amount of worker processes.
+            Defaults to None, for the amount of CPUs.
+
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        search = ParallelBFS(self.state, n_workers, self.instrumentation, self.progress)
+        self.visited = None
+        result = search.run()
+        self.expanded_nodes = search.expanded_nodes
+        return result
+
+    @_instrumented
+    def external_bfs(self, max_memory=64 * 2**20, work_folder=None):
+        """
+        Breadth first search with its layers kept in sorted files on
+        disk, as described in ExternalBFS, for levels whose state space
+        doesn't fit in memory.
+
+        Args:
+            max_memory (int, optional): Maximum memory of the buffer of
+            children, in bytes. Defaults to 64MB.
+
+            work_folder (str, optional): Folder for the layer files.
+            Defaults to None, for ExternalBFS.work_folder.
+
+        Returns:
+            KlotskiState: A final state of the game, with the least
+            amount of moves.
+        """
+        search = ExternalBFS(self.state, max_memory, work_folder, self.instrumentation, self.progress)
+        self.visited = None
+        result = search.run()
+        self.expanded_nodes = search.expanded_nodes
+        return result
+
+    @_instrumented
+    def bidirectional_bfs(self, target_file=None, max_nodes=None, max_memory=None):
+        """
+        Breadth first search done from both the initial state and the
+        final ones at the same time, until both sides meet. As every
+        Klotski move can be undone by moving the same piece back, the
+        backwards search uses the same move generation. Each step
+        expands a whole layer of the side with the smaller frontier.
+
+        It only saves expansions when a target board is given: the
+        backwards side started from every final board expands more
+        nodes than the plain bfs on the levels of set1.
+
+        Args:
+            target_file (str, optional): Path of a board file with the
+            final board to be reached. Defaults to None, in which case
+            every board with the red piece over the goals is used.
+
+            max_nodes (int, optional): Maximum amount of nodes to be
+            expanded. Defaults to None, for no limit.
+
+            max_memory (int, optional): Maximum estimated memory of the
+            frontiers and visited sets, in bytes. Defaults to None, for
+            no limit.
+
+        Raises:
+            SearchBudgetExceeded: If a budget runs out before both sides
+            meet.
+
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        if target_file is not None:
+            _, proto_board = self._parse_board_file(target_file)
+            boards = [self.catalog.relabel(self.layout.encode(proto_board))]
+        else:
+            boards = self.catalog.final_boards()
+        targets = [KlotskiState(board, self.catalog) for board in boards]
+
+        budget = SearchBudget(self.state, max_nodes, max_memory)
+        # a given target isn't the same as its mirror
+        use_symmetry = target_file is None
+        forward = self.visited = VisitedMap(self.state, use_symmetry)
+        backward = VisitedMap(self.state, use_symmetry)
+        forward.add(self.state)
+        for target in targets:
+            backward.add(target)
+        self.expanded_nodes = 0
+
+        meeting = backward.get(self.state)
+        if meeting is not None:
+            return self._join_paths(self.state, meeting)
+
+        forward_frontier = [self.state]
+        backward_frontier = targets
+        children = self.instrumentation.children(KlotskiState.children)
+        add = {side: self.instrumentation.visited_add(side.add) for side in (forward, backward)}
+        get = {side: self.instrumentation.timed('visited', side.get) for side in (forward, backward)}
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                side, other, frontier = forward, backward, forward_frontier
+            else:
+                side, other, frontier = backward, forward, backward_frontier
+
+            # the whole layer is expanded before choosing the shortest
+            # of the paths through the states where both sides met
+            best = None
+            next_frontier = []
+            for current in frontier:
+                self.expanded_nodes += 1
+                budget.check(self.expanded_nodes, len(forward_frontier) + len(backward_frontier),
+                             forward, backward)
+                self._report_progress(len(forward_frontier) + len(backward_frontier))
+
+                for child in children(current):
+                    if not add[side](child):
+                        continue
+                    next_frontier.append(child)
+
+                    met = get[other](child)
+                    if met is not None and (best is None or child.depth + met.depth < best[0]):
+                        best = (child.depth + met.depth, child, met)
+
+            if best is not None:
+                _, child, met = best
+                if side is forward:
+                    return self._join_paths(child, met)
+                return self._join_paths(met, child)
+
+            if side is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        return None
+
+    @staticmethod
+    def _join_paths(forward_state, backward_state):
+        """
+        Joins the path of the forward search with the path of the
+        backwards one, both ending in states with the same canonical
+        key. The backwards path is replayed from the forward state with
+        its moves undone, after converting its piece ids into the ones
+        of the pieces that sit in the same cells of the forward state.
+        If the two states are only the same up to the mirror symmetry,
+        the backwards path is mirrored too, and it still ends in a final
+        state, as the goals are symmetric.
+
+        Args:
+            forward_state (KlotskiState): Last state of the forward path.
+
+            backward_state (KlotskiState): Last state of the backwards
+            path, whose parents lead to a final state.
+
+        Returns:
+            KlotskiState: The final state, with the joined path as its
+            history.
+        """
+        catalog = forward_state.catalog
+        backward_board = backward_state.board
+        opposites = KlotskiState.direction_opposites
+        if backward_board.translate(catalog.key_table) != forward_state.board.translate(catalog.key_table):
+            backward_board = catalog.mirror(backward_board)
+            opposites = dict(opposites, left='left', right='right')
+        piece_ids = dict(zip(backward_board, forward_state.board))
+
+        state = forward_state
+        node = backward_state
+        while node.parent is not None:
+            move = Move(piece_ids[node.move.piece_id + 1] - 1, opposites[node.move.direction])
+            state = state.do_move(move)
+            node = node.parent
+
+        return state
+
+    @_instrumented
+    def iterative_deepening_search(self, table_size=1000000):
+        """
+        Depth limited searches with the limit raised by one each time,
+        so the first solution found has the least amount of moves.
+
+        Args:
+            table_size (int, optional): Maximum amount of entries of the
+            TranspositionTable that prunes states already reached with
+            as few moves in the current iteration. Defaults to 1000000.
+
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        self.visited = None
+        self.expanded_nodes = 0
+        table = TranspositionTable(table_size)
         for i in range(1, 100):
-            goal = self._depth_limited_dfs(i)
+            table.new_iteration()
+            goal = self._depth_limited_dfs(i, table)
             if goal is not None:
                 return goal
                         
         return None  
     
-    def _depth_limited_dfs(self, depth_limit):
-        queue = deque([self.state])   # initialize the queue to store the nodes
-        visited = Trie()
-        
-        while queue:
-            current = queue.pop()
-            visited.insert(self.state.id_matrix)
+    def _depth_limited_dfs(self, depth_limit, table):
+        """
+        Depth first search over the lazy successors of the states of
+        the current path, like the DFS, that doesn't go past a depth.
+        A state is skipped if it was already reached in this search with
+        as few moves, which, unlike a plain visited set, can't hide the
+        only short enough path to a final state.
 
-            if current.is_complete():
-                return current
-            
-            if len(current.move_history) < depth_limit:
-                for child in current.children():
-                    if not visited.is_in_trie(child.id_matrix):
-                        queue.append(child)
+        Args:
+            depth_limit (int): Maximum amount of boards of a path, the
+            initial one included.
+
+            table (TranspositionTable): The table of the states reached,
+            started for this search.
+
+        Returns:
+            KlotskiState: A final state of the game, or None if none is
+            within the limit.
+        """
+        key = VisitedSet(self.state).key
+        successors = self.instrumentation.children(KlotskiState.successors)
+        visit = self.instrumentation.visited_add(table.visit)
+
+        table.visit(key(self.state), 0)
+        self.expanded_nodes += 1
+        if self.state.is_complete():
+            return self.state
+        if depth_limit <= 1:
+            return None
+
+        stack = [successors(self.state)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            if not visit(key(child), child.depth):
+                continue
+
+            self.expanded_nodes += 1
+            self._report_progress(len(stack))
+            if child.is_complete():
+                return child
+
+            # the path up to the child has depth + 1 boards
+            if child.depth + 1 < depth_limit:
+                stack.append(successors(child))
                 
         return None
     
@@ -142,6 +649,7 @@ class Klotski:
     #                            HEURISTIC SEARCH
     # =============================================================================
     
+    @_instrumented
     def a_star(self, manhattan_multi, zeros_empty_multi, inbet_multi, len_multi=1):
         """
         The A Star algorith, which is simply the Greedy Search but
@@ -163,14 +671,323 @@ class Klotski:
         Returns:
             KlotskiState: A final state of the game.
         """
-        heuristic = lambda self, other: \
-            self.heuristic(manhattan_multi, zeros_empty_multi, inbet_multi) + (len(self.move_history) - 1) * len_multi \
-            < other.heuristic(manhattan_multi, zeros_empty_multi, inbet_multi) + (len(other.move_history) - 1) * len_multi
-        return self.greedy_search(heuristic=heuristic)
+        heuristic = WeightedHeuristic(self.catalog, manhattan_multi, zeros_empty_multi, inbet_multi)
+        evaluate = lambda states: \
+            [h + state.depth * len_multi for h, state in zip(heuristic.evaluate_batch(states), states)]
+        return self._best_first_search(evaluate, track_g=True)
+    
+    @_instrumented
+    def optimal_a_star(self, use_pattern_database=True):
+        """
+        The A Star with an admissible and consistent heuristic, which
+        makes the solutions it returns optimal.
+
+        Args:
+            use_pattern_database (boolean, optional): If True, the
+            heuristic is the PatternDatabase of the level, loaded from
+            its cache or built on the first use. If False, only the red
+            piece distance to the goals is used. Defaults to True.
+
+        Returns:
+            KlotskiState: A final state of the game, with the least
+            amount of moves.
+        """
+        if use_pattern_database:
+            heuristic = PatternDatabase(self.catalog).lookup
+        else:
+            heuristic = admissible_heuristic
+        evaluate = lambda states: [heuristic(state) + state.depth for state in states]
+        return self._best_first_search(evaluate, track_g=True)
+    
+    @_instrumented
+    def ida_star(self, use_pattern_database=True, table_size=100000):
+        """
+        Iterative deepening A Star: depth first searches limited by the
+        amount of moves plus the heuristic, the limit being raised on
+        each iteration to the lowest value that went over it. Only the
+        current path and a bounded TranspositionTable are kept, so the
+        memory it takes is nearly constant. Once the children of a state
+        are searched, the lowest value found below them, or through its
+        parent, is learned in the table as its heuristic.
+
+        Args:
+            use_pattern_database (boolean, optional): Whether to use the
+            PatternDatabase of the level as the heuristic, instead of
+            only the red piece distance. Defaults to True.
+
+            table_size (int, optional): Maximum amount of entries of the
+            transposition table. Defaults to 100000.
+
+        Returns:
+            KlotskiState: A final state of the game, with the least
+            amount of moves.
+        """
+        if use_pattern_database:
+            heuristic = PatternDatabase(self.catalog).lookup
+        else:
+            heuristic = admissible_heuristic
+
+        heuristic = self.instrumentation.heuristic(heuristic)
+        children = self.instrumentation.children(KlotskiState.children)
+        table = TranspositionTable(table_size)
+        visit = self.instrumentation.visited_add(table.visit)
+        key = VisitedSet(self.state).key
+        self.visited = None
+        self.expanded_nodes = 0
+
+        if self.state.is_complete():
+            return self.state
+
+        root_key = key(self.state)
+        bound = heuristic(self.state)
+        while bound != float('inf'):
+            table.new_iteration()
+            table.visit(root_key, 0)
+            next_bound = float('inf')
+
+            # each frame holds a state of the current path, its key, the
+            # iterator over its children and the lowest value found
+            # below it, which is learned as its heuristic once it's done
+            stack = [[self.state, root_key, iter(children(self.state)), float('inf')]]
+            while stack:
+                frame = stack[-1]
+                child = next(frame[2], None)
+                if child is None:
+                    stack.pop()
+                    state, state_key, _, lowest = frame
+                    distance = lowest - state.depth
+                    if stack:
+                        stack[-1][3] = min(stack[-1][3], lowest)
+                        # children() skips the move back to the parent,
+                        # so a shortest path through it is only bounded
+                        # by the parent's own heuristic
+                        parent, parent_key = stack[-1][0], stack[-1][1]
+                        distance = min(distance, 1 + max(heuristic(parent), table.learned(parent_key)))
+                    table.learn(state_key, distance)
+                    continue
+
+                child_key = key(child)
+                f = child.depth + max(heuristic(child), table.learned(child_key))
+                if f > bound:
+                    next_bound = min(next_bound, f)
+                    frame[3] = min(frame[3], f)
+                    continue
+
+                if child.is_complete():
+                    return child
+
+                if visit(child_key, child.depth):
+                    self.expanded_nodes += 1
+                    self._report_progress(len(stack))
+                    stack.append([child, child_key, iter(children(child)), float('inf')])
+                else:
+                    frame[3] = min(frame[3], f)
+
+            bound = next_bound
+
+        return None
     
-    def greedy_search(self, manhattan_multi=12, zeros_empty_multi=1, inbet_multi=2, heuristic=None):
+    @_instrumented
+    def weighted_a_star(self, weight=2, use_pattern_database=True):
+        """
+        The A Star with its admissible heuristic multiplied by a weight,
+        which finds a solution faster than the optimal A Star, at most
+        weight times longer than the optimal one. The bound proven for
+        the solution found, often lower than the weight, is left in
+        solution_bound.
+
+        Args:
+            weight (float, optional): Weight of the heuristic, at least
+            1. Defaults to 2.
+
+            use_pattern_database (boolean, optional): Whether to use the
+            PatternDatabase of the level as the heuristic, instead of
+            only the red piece distance. Defaults to True.
+
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        return self._anytime_search([weight], None, use_pattern_database)
+
+    @_instrumented
+    def anytime_a_star(self, initial_weight=3, weight_step=.5, time_limit=None, use_pattern_database=True):
         """
-        The Greedy Search Alogorithm.
+        Anytime Repairing A Star (ARA*): a weighted A Star whose weight
+        is lowered after each solution, down to 1, reusing the search
+        done so far instead of starting over. The first solution comes
+        as fast as the weighted A Star's and the next ones are shorter,
+        until the last one is optimal or the time runs out. Whenever a
+        better solution is found, the improvement callback is called
+        with it and its proven suboptimality bound.
+
+        Args:
+            initial_weight (float, optional): Weight of the heuristic on
+            the first search, at least 1. Defaults to 3.
+
+            weight_step (float, optional): Amount the weight is lowered
+            by after each search. Defaults to 0.5.
+
+            time_limit (float, optional): Seconds after which the best
+            solution found is returned. Defaults to None, for no limit.
+
+            use_pattern_database (boolean, optional): Whether to use the
+            PatternDatabase of the level as the heuristic, instead of
+            only the red piece distance. Defaults to True.
+
+        Returns:
+            KlotskiState: The best final state found, or None if there
+            was none when the time ran out.
+        """
+        if weight_step <= 0:
+            raise Exception('The weight step must be positive')
+        weights = []
+        weight = initial_weight
+        while weight > 1:
+            weights.append(weight)
+            weight -= weight_step
+        weights.append(1)
+        return self._anytime_search(weights, time_limit, use_pattern_database)
+
+    def _anytime_search(self, weights, time_limit, use_pattern_database):
+        """
+        ARA*, run with each of the weights in turn. States expanded by a
+        search are closed for the rest of it: if one is reached again
+        with fewer moves, it's only kept aside and reopened by the next
+        search. A search stops when no open state has a weighted value
+        below the length of the best solution, which makes that solution
+        at most weight times longer than optimal.
+
+        The suboptimality bound also uses the lowest moves plus
+        heuristic of the open and set aside states, which is a lower
+        bound of the optimal length as the heuristic is admissible.
+
+        Args:
+            weights (list of float): The weights, in the order they're
+            used.
+
+            time_limit (float): Seconds after which the best solution
+            found is returned, or None for no limit.
+
+            use_pattern_database (boolean): Whether to use the level's
+            PatternDatabase as the heuristic.
+
+        Returns:
+            KlotskiState: The best final state found.
+        """
+        if min(weights) < 1:
+            raise Exception('The heuristic weights must be at least 1')
+
+        if use_pattern_database:
+            heuristic = PatternDatabase(self.catalog).lookup
+        else:
+            heuristic = admissible_heuristic
+
+        heuristic = self.instrumentation.heuristic(heuristic)
+        children = self.instrumentation.children(KlotskiState.children)
+        key = VisitedSet(self.state).key
+        self.visited = None
+        self.expanded_nodes = 0
+        self.solution_bound = None
+        deadline = time() + time_limit if time_limit is not None else None
+
+        if self.state.is_complete():
+            self.solution_bound = 1
+            return self.state
+
+        # the state with the fewest moves and the heuristic value of
+        # every key reached, the keys open and the ones set aside
+        root_key = key(self.state)
+        states = {root_key: self.state}
+
+        # keeps a state unless its key was reached with as few moves,
+        # as a visited set insertion would
+        def reach(state, state_key):
+            known = states.get(state_key)
+            if known is not None and known.depth <= state.depth:
+                return False
+            states[state_key] = state
+            return True
+
+        reach = self.instrumentation.visited_add(reach)
+        h = {root_key: heuristic(self.state)}
+        open_keys = {root_key}
+        inconsistent = set()
+        best = None
+        cost = float('inf')
+
+        def bound():
+            lowest = min((states[k].depth + h[k] for k in open_keys | inconsistent), default=cost)
+            if lowest >= cost:
+                return 1
+            return cost / lowest if lowest > 0 else float('inf')
+
+        for weight in weights:
+            open_keys |= inconsistent
+            inconsistent = set()
+            closed = set()
+
+            open_list = OpenList()
+            push = self.instrumentation.open_push(open_list.push_batch)
+            batch = [states[k] for k in open_keys]
+            push(batch, [state.depth + weight * h[k] for state, k in zip(batch, open_keys)],
+                 [state.depth for state in batch], list(open_keys))
+
+            while True:
+                current = open_list.pop()
+                if current is None:
+                    break
+                current_key = key(current)
+                if current.depth + weight * h[current_key] >= cost:
+                    break
+                if deadline is not None and time() > deadline:
+                    self.solution_bound = bound() if best is not None else None
+                    return best
+
+                open_keys.discard(current_key)
+                closed.add(current_key)
+                self.expanded_nodes += 1
+                self._report_progress(len(open_keys))
+
+                batch = []
+                improved = False
+                for child in children(current):
+                    child_key = key(child)
+                    if not reach(child, child_key):
+                        continue
+
+                    if child_key not in h:
+                        h[child_key] = heuristic(child)
+                    if child_key in closed:
+                        inconsistent.add(child_key)
+                    else:
+                        open_keys.add(child_key)
+                        batch.append((child, child_key))
+
+                    if child.is_complete() and child.depth < cost:
+                        best, cost = child, child.depth
+                        improved = True
+
+                push([child for child, _ in batch], [child.depth + weight * h[k] for child, k in batch],
+                     [child.depth for child, _ in batch], [k for _, k in batch])
+
+                if improved:
+                    self.solution_bound = bound()
+                    if self.improvement is not None:
+                        self.improvement(best, self.solution_bound)
+
+            if best is not None:
+                self.solution_bound = min(weight, bound())
+
+        return best
+
+    @_instrumented
+    def greedy_search(self, manhattan_multi=12, zeros_empty_multi=1, inbet_multi=2, heuristic=None,
+                      max_open=None):
+        """
+        The Greedy Search Alogorithm. With max_open, the open list is
+        bounded: whenever it passes that size, its worst nodes are
+        dropped, which bounds the memory taken at the risk of dropping
+        every way to the goals.
 
         Args:
             manhattan_multi (float): Weight for the Manhattan distance.
@@ -181,32 +998,141 @@ class Klotski:
             inbet_multi (float): Weight for the check if the the empty 
             squares are between the red piece and the goals.
 
-            heuristic (function): The state evaluation heuristic to be
-            used in the greedy aspect of the search. Defaults to None,
-            in this case creating one from the other arguments.
+            heuristic (function): The state evaluation function to be
+            minimized in the greedy aspect of the search, taking a
+            KlotskiState. Defaults to None, in this case creating one
+            from the other arguments.
+
+            max_open (int, optional): Maximum amount of nodes in the
+            open list. Defaults to None, for no limit.
 
         Returns:
-            KlotskiState: A final state of the game.
+            KlotskiState: A final state of the game, or None if the
+            nodes left couldn't reach the goals.
         """
         if heuristic is None:
-            heuristic = lambda self, other: \
-                self.heuristic(manhattan_multi, zeros_empty_multi, inbet_multi) \
-                < other.heuristic(manhattan_multi, zeros_empty_multi, inbet_multi)
-        setattr(KlotskiState, "__lt__", heuristic)
-        
-        states = [self.state]
-        visited = Trie()
-        
-        while states:
-            current = heapq.heappop(states)
-            visited.insert(current.id_matrix)
+            evaluate = WeightedHeuristic(
+                self.catalog, manhattan_multi, zeros_empty_multi, inbet_multi).evaluate_batch
+        else:
+            evaluate = lambda states: [heuristic(state) for state in states]
+        return self._best_first_search(evaluate, track_g=False, max_open=max_open)
+
+    @_instrumented
+    def beam_search(self, manhattan_multi=12, zeros_empty_multi=1, inbet_multi=2, beam_width=1000):
+        """
+        Breadth first search that only keeps, on each layer, the
+        beam_width new states of lowest heuristic value, the whole layer
+        being evaluated at once. The memory and time it takes grow
+        linearly with the amount of moves, but its solutions may not be
+        optimal, and it may find none if every way to the goals falls
+        out of the beam.
+
+        Args:
+            manhattan_multi (float): Weight for the Manhattan distance.
+
+            zeros_empty_multi (float): Weight for the the distance
+            between the empty squares and the red piece.
+
+            inbet_multi (float): Weight for the check if the the empty
+            squares are between the red piece and the goals.
+
+            beam_width (int, optional): Maximum amount of states of a
+            layer. Defaults to 1000.
+
+        Returns:
+            KlotskiState: A final state of the game, or None if the beam
+            ran out of states.
+        """
+        evaluate = self.instrumentation.heuristic(WeightedHeuristic(
+            self.catalog, manhattan_multi, zeros_empty_multi, inbet_multi).evaluate_batch)
+        children = self.instrumentation.children(KlotskiState.children)
+        visited = self.visited = VisitedSet(self.state)
+        add = self.instrumentation.visited_add(visited.add)
+        contains = self.instrumentation.visited_contains(visited.__contains__)
+        self.expanded_nodes = 0
+
+        add(self.state)
+        layer = [self.state]
+        while layer:
+            batch = []
+            for state in layer:
+                self.expanded_nodes += 1
+                self._report_progress(len(layer))
+                if state.is_complete():
+                    return state
+                batch.extend(child for child in children(state) if not contains(child))
+
+            # only the states kept are marked as visited, the others may
+            # still be kept when reached later; add also drops the
+            # states reached twice within the layer
+            if len(batch) > beam_width:
+                values = evaluate(batch)
+                batch = [batch[i] for i in sorted(range(len(batch)), key=values.__getitem__)]
+            layer = []
+            for child in batch:
+                if add(child):
+                    layer.append(child)
+                    if len(layer) == beam_width:
+                        break
+
+        return None
+
+    def _best_first_search(self, evaluate, track_g, max_open=None):
+        """
+        Best-first search over an OpenList, shared by the Greedy Search
+        and the A Star. The children of each expansion are evaluated
+        together, once, when generated, and pushed as a batch.
+
+        Args:
+            evaluate (function): Gives the values of a list of
+            KlotskiState; lower values are expanded first.
+
+            track_g (boolean): If True, a state is pushed again whenever
+            it's reached with fewer moves than before, and reopened if it
+            was already expanded, as the A Star needs. If False, states
+            are expanded only once.
+
+            max_open (int, optional): Maximum amount of entries of the
+            open list. Once it's passed, the worst quarter of them is
+            dropped, so that the cost of trimming the list is spread over
+            many expansions. Defaults to None, for no limit.
+
+        Returns:
+            KlotskiState: A final state of the game.
+        """
+        open_list = OpenList()
+        visited = self.visited = VisitedSet(self.state)
+        key = visited.key
+        self.expanded_nodes = 0
+
+        evaluate = self.instrumentation.heuristic(evaluate)
+        children = self.instrumentation.children(KlotskiState.children)
+        add = self.instrumentation.visited_add(visited.add)
+        contains = self.instrumentation.visited_contains(visited.__contains__)
+        push = self.instrumentation.open_push(open_list.push_batch)
+
+        open_list.push(self.state, evaluate([self.state])[0], 0, key(self.state) if track_g else None)
+
+        while open_list:
+            current = open_list.pop()
+            if current is None:
+                break
+            if not add(current) and not track_g:
+                continue
+            self.expanded_nodes += 1
+            self._report_progress(len(open_list))
 
             if current.is_complete():
                 return current
 
-            for child in current.children():
-                if not visited.is_in_trie(child.id_matrix):
-                    heapq.heappush(states, child)
-        
-        return None
+            if track_g:
+                batch = children(current)
+                push(batch, evaluate(batch), [child.depth for child in batch], [key(child) for child in batch])
+            else:
+                batch = [child for child in children(current) if not contains(child)]
+                push(batch, evaluate(batch))
 
+            if max_open is not None and len(open_list) > max_open:
+                open_list.truncate(max_open - max_open // 4)
+
+        return None
@@ -1,5 +1,4 @@
-from copy import deepcopy
-
+from model.board_layout import BoardLayout
 from model.move import Move
 
 
@@ -15,55 +14,93 @@ class KlotskiState:
     search for new moves easier to read.
     """
     possible_directions = ('up', 'left', 'down', 'right')
-    direction_sums = {
-        'up': (-1, 0),
-        'left': (0, -1),
-        'down': (1, 0),
-        'right': (0, 1)
-    }
     direction_opposites = {
         'up': 'down',
         'left': 'right',
         'down': 'up',
         'right': 'left'
     }
-    direction_adjascents = {
-        'up': ('left', 'right'),
-        'left': ('up', 'down'),
-        'down': ('left', 'right'),
-        'right': ('up', 'down')
-    }
 
-    def __init__(self, board, goals, move_history=[]):
+    __slots__ = ('board', 'catalog', 'layout', 'goals', 'anchors', 'empties',
+                 'parent', 'move', 'depth')
+
+    def __init__(self, board, catalog, parent=None, move=None, anchors=None, empties=None):
         """
         Args:
-            board (Cell matrix): Matrix that represents a state of the 
-            game. Cells of id 0 represent the game's red square and 
-            cells of id -1 represent empty squares.
+            board (bytes): Compact encoding of the board, as described
+            in BoardLayout. Cells of id 0 represent the game's red
+            square and cells of id -1 represent empty squares.
+
+            catalog (PieceCatalog): The pieces and the geometry of the
+            level this state belongs to.
+
+            parent (KlotskiState, optional): The state this one was
+            reached from. Defaults to None, for the initial state.
+
+            move (Move, optional): The move done on the parent to reach
+            this state. Defaults to None, for the initial state.
+
+            anchors (tuple of int, optional): The anchor of each piece,
+            as described in PieceCatalog, indexed by the piece encoding
+            (id + 1).
 
-            goals (array of 2D tuples): List made out of (row, col) 
-            tuples with the red square's end goal.
+            empties (tuple of int, optional): Sorted indexes of the
+            empty cells. Both anchors and empties are found by scanning
+            the board if not given, which is only needed for the
+            initial state, as every move updates them incrementally.
+        """
+        self.board = board
+        self.catalog = catalog
+        self.layout = catalog.layout
+        self.goals = self.layout.goals
+
+        if anchors is None:
+            anchors, empties = self._find_pieces()
+        self.anchors = anchors
+        self.empties = empties
 
-            move_history (list, optional): List made of out id (int)
-            matrices, these being the past board states that led to
-            this one. The matrices are made out of integers instead of
-            Cell instances for it being a simpler data structure, and
-            the pointers to adjascent cells not being necessary for
-            what this is used.
+        self.parent = parent
+        self.move = move
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    @property
+    def zeros(self):
+        """
+        Indexes of the red square cells (id == 0).
         """
-        self.board = deepcopy(board)
-        self.max_row = len(self.board) - 1
-        self.max_col = len(self.board[0]) - 1
+        return self.catalog.cells[BoardLayout.RED][self.anchors[BoardLayout.RED]]
 
-        self.goals = goals
+    @property
+    def id_matrix(self):
+        """
+        The state's board as a matrix of piece ids.
+        """
+        return self.layout.decode(self.board)
 
-        self.empties = self._find_empties()
-        self.empty0, self.empty1 = self.empties
+    def path(self):
+        """
+        Rebuilds the sequence of states that led to this one by
+        following the parent references.
 
-        self.zeros = self._find_zeros()
+        Returns:
+            list of KlotskiState: The states from the initial one up
+            to this one.
+        """
+        states = []
+        state = self
+        while state is not None:
+            states.append(state)
+            state = state.parent
+        states.reverse()
+        return states
 
-        self.id_matrix = self._get_id_matrix()
-        self.move_history = [] + move_history + [self.id_matrix]
+    @property
+    def move_history(self):
+        """
+        List made of out id (int) matrices, these being the past board
+        states that led to this one, ending with the current one.
+        """
+        return [state.id_matrix for state in self.path()]
 
     def __eq__(self, other):
         """
@@ -79,15 +116,11 @@ class KlotskiState:
             boolean: True if they're equal, False if not.
         """
         assert type(other) is KlotskiState
-        if len(self.board) != len(other.board) or len(self.board[0]) != len(other.board[0]):
+        if len(self.board) != len(other.board):
             raise Exception('Boards of different size being compared')
-        
-        for i in range(len(self.board)):
-            for j in range(len(self.board[0])):
-                if self.board[i][j].id != other.board[i][j].id:
-                    return False
-        return True
-    
+
+        return self.board == other.board
+
     def __str__(self):
         """
         Conversion of the state to string.
@@ -96,157 +129,87 @@ class KlotskiState:
             str: String representation of the current state.
         """
         values = []
-        for row in self.board:
+        for row in self.id_matrix:
             line = []
-            for cell in row:
-                n_spaces = 3 - len(str(cell.id))
+            for id in row:
+                n_spaces = 3 - len(str(id))
                 spaces = ''.join([' ' for _ in range(n_spaces)])
-                line.append(f'{cell.id}{spaces}')
-                
+                line.append(f'{id}{spaces}')
+
             values.append(''.join(line))
-        
+
         return '\n'.join(values)
 
-    def _find_empties(self):
+    def _find_pieces(self):
         """
-        Search for the empty Cells (id == -1)
+        Search the board for the anchor of each piece and for the empty
+        cells (id == -1).
 
         Returns:
-            Tuple of 2D tuples: List of tuples made out of rows 
-            and cols.
+            tuple: The anchor of each piece, indexed by the piece
+            encoding, and the sorted indexes of the empty cells.
         """
+        anchors = [-1] * self.catalog.n_codes
         empties = []
-        for row in range(len(self.board)):
-            for col in range(len(self.board[0])):
-                if self.board[row][col].is_empty():
-                    empties.append(self.board[row][col])
-
-        if len(empties) != 2:
-            print(empties)
-            raise Exception("This shouldn't happen")
-        return set(empties)
-
-    def _find_zeros(self):
-        """
-        Search for the red square Cells (id == 0)
-
-        Returns:
-            Tuple of 2D tuples: List of tuples made out of rows 
-            and cols.
-        """
-        zeros = []
-        for row in range(len(self.board)):
-            for col in range(len(self.board[0])):
-                if self.board[row][col].is_red_piece():
-                    zeros.append(self.board[row][col])
-
-        return set(zeros)
-
-    def _get_id_matrix(self):
-        """
-        Creates a matrix made out of the board Cells ids
-
-        Returns:
-            int matrix: Cell id matrix
-        """
-        return [[cell.id for cell in row] for row in self.board]
-
-    def _empties_connected(self):
-        """
-        Checks if the empty squares are connecting by calculating
-        their manhattan distance, and returning True of this 
-        distance equals 1.
-
-        Returns:
-            boolean: True if connected, False if not.
-        """
-        return abs(self.empty0.row - self.empty1.row) + abs(self.empty0.col - self.empty1.col) == 1
+        for i, code in enumerate(self.board):
+            if code == BoardLayout.EMPTY:
+                empties.append(i)
+            elif anchors[code] < 0:
+                anchors[code] = i
 
-    def _get_double_moves(self):
-        """
-        Checks for the orientation of the connected empty squares 
-        and looks for pieces that could be moved into their places.
+        return tuple(anchors), tuple(empties)
 
-        Returns:
-            list of Move: Possible double moves that can be done.
+    def iter_moves(self):
         """
-        doubles = []
-        if self.empty0.row == self.empty1.row:
-            if self.empty0.row >= 1 and self.empty0.up.id == self.empty1.up.id:
-                doubles.append(
-                    Move(self.empty0.up.id, 'down'))
-
-            if self.empty0.row <= self.max_row - 1 \
-                    and self.empty0.down.id == self.empty1.down.id:
-                doubles.append(
-                    Move(self.empty0.down.id, 'up'))
-
-        elif self.empty0.col == self.empty1.col:
-            if self.empty0.col >= 1 and self.empty0.left.id == self.empty1.left.id:
-                doubles.append(
-                    Move(self.empty0.left.id, 'right'))
-
-            if self.empty0.col <= self.max_col - 1 and self.empty0.right.id == self.empty1.right.id:
-                doubles.append(
-                    Move(self.empty0.right.id, 'left'))
-
-        else:
-            raise Exception(
-                '''this shouldn't happen; check the empties connection func''')
-
-        return doubles
+        Looks for the pieces adjascent to the empty cells and checks in
+        the catalog's move tables if they can be moved into them. The
+        move that would undo the one that led to this state is skipped,
+        as it only leads back to the parent. Moves are found lazily,
+        as they are asked for.
 
-    def _get_single_moves(self):
+        Yields:
+            Move: Possible moves that can be done.
         """
+        board = self.board
+        neighbors = self.layout.neighbors
+        piece_moves = self.catalog.moves
+        anchors = self.anchors
 
-        Returns:
-            _type_: _description_
-        """
-        # this assumes that every piece is rectangular
-        singles = []
+        tested = set()
+        if self.move is not None:
+            tested.add((self.move.piece_id + 1, self.direction_opposites[self.move.direction]))
 
         for e in self.empties:
             for dir in self.possible_directions:
-                row_sum, col_sum = self.direction_sums[dir]
-                # gets the adjascent indexes to be tested
-                test_row, test_col = e.row + row_sum, e.col + col_sum
-
-                if test_row >= 0 and test_row <= self.max_row \
-                        and test_col >= 0 and test_col <= self.max_col:
-
-                    test_cell = self.board[test_row][test_col]
-                    if test_cell.is_empty():
-                        continue
+                cell = neighbors[dir][e]
+                if cell < 0 or board[cell] == BoardLayout.EMPTY:
+                    continue
 
-                    adj0, adj1 = self.direction_adjascents[dir]
-                    # checks if the piece is skinny enough to fit into the single
-                    # empty spot
-                    if (test_cell[adj0] is None or test_cell.id != test_cell[adj0].id) \
-                            and (test_cell[adj1] is None or test_cell.id != test_cell[adj1].id):
+                code = board[cell]
+                # the piece would be moved towards the empty cell
+                direction = self.direction_opposites[dir]
+                if (code, direction) in tested:
+                    continue
+                tested.add((code, direction))
 
-                        singles.append(
-                            Move(test_cell.id, self.direction_opposites[dir]))
-
-        return singles
+                entry = piece_moves[code][anchors[code]].get(direction)
+                if entry is not None and all(board[c] == BoardLayout.EMPTY for c in entry[1]):
+                    yield Move(code - 1, direction)
 
     def _get_top_left_most_red_square(self):
         """
-        Iterates through the Cell matrix and returns the first 
-        red square it finds. Used to calculate the manhattan distance.
+        Returns the first red square in the board. Used to calculate
+        the manhattan distance.
 
         Returns:
             int tuple: 2D int tuple of (row, col)
         """
+        return self.layout.coords[self.anchors[BoardLayout.RED]]
 
-        for row in range(len(self.board)):
-            for col in range(len(self.board[0])):
-                if self.board[row][col].is_red_piece():
-                    return (row, col)
-        raise Exception('''this shouldn't happen''')
-
-    def _do_move(self, move):
+    def do_move(self, move):
         """
-        Creates a new KlotskiState from a possible move.
+        Creates a new KlotskiState from a possible move, updating only
+        the cells the moved piece leaves and enters.
 
         Args:
             move (Move): The move to be done.
@@ -254,8 +217,20 @@ class KlotskiState:
         Returns:
             KlotskiState: State reachable by the move.
         """
-        new_board = move.resulting_board(self.board)
-        return KlotskiState(new_board, self.goals, self.move_history)
+        code = move.piece_id + 1
+        new_anchor, entered, vacated = self.catalog.moves[code][self.anchors[code]][move.direction]
+
+        board = bytearray(self.board)
+        for cell in vacated:
+            board[cell] = BoardLayout.EMPTY
+        for cell in entered:
+            board[cell] = code
+
+        anchors = list(self.anchors)
+        anchors[code] = new_anchor
+        empties = tuple(sorted([e for e in self.empties if e not in entered] + list(vacated)))
+
+        return KlotskiState(bytes(board), self.catalog, self, move, tuple(anchors), empties)
 
     def _manhattan(self):
         """
@@ -265,11 +240,7 @@ class KlotskiState:
         Returns:
             int: Manhattan distance.
         """
-        origin = self._get_top_left_most_red_square()
-        goal = self.goals[0]
-
-        return abs(origin[0] - goal[0]) \
-            + abs(origin[1] - goal[1])
+        return self.catalog.heuristic_tables.manhattan[self.anchors[BoardLayout.RED]]
 
     def _zeros_empties_distance(self):
         """
@@ -279,12 +250,8 @@ class KlotskiState:
         Returns:
             int: Manhattan distance.
         """
-        dist_func = lambda x, y: abs(x.row - y.row) + abs(x.col - y.col)
-
-        dist0 = min([dist_func(z, self.empty0) for z in self.zeros]) - 1
-        dist1 = min([dist_func(z, self.empty1) for z in self.zeros]) - 1
-
-        return dist0 + dist1
+        distances = self.catalog.heuristic_tables.zeros_empty[self.anchors[BoardLayout.RED]]
+        return sum(distances[e] for e in self.empties)
 
     def _empties_inbetween_zeros_goals(self):
         """
@@ -294,15 +261,8 @@ class KlotskiState:
         Returns:
             int: Sum of the values.
         """
-        v0 = int(any([self.empty0.row == z.row == o[0] \
-                    or self.empty0.col == z.col == o[1] \
-                    for z in self.zeros for o in self.goals]))
-        
-        v1 = int(any([self.empty1.row == z.row == o[0] \
-                    or self.empty1.col == z.col == o[1] \
-                    for z in self.zeros for o in self.goals]))
-        
-        return v0 + v1
+        inbetween = self.catalog.heuristic_tables.inbetween[self.anchors[BoardLayout.RED]]
+        return sum(inbetween[e] for e in self.empties)
 
     def heuristic(self, manhattan_multi, zeros_empty_multi, inbet_multi):
         """
@@ -327,27 +287,35 @@ class KlotskiState:
 
     def children(self):
         """
-        Generates the reachable statles from the current one.
+        Generates the reachable statles from the current one, apart
+        from its parent.
 
         Returns:
             List of KlotskiState: Reachable states.
         """
-        moves = []
-        if self._empties_connected():
-            moves += self._get_double_moves()
-        moves += self._get_single_moves()
+        return [self.do_move(m) for m in self.iter_moves()]
+
+    def successors(self):
+        """
+        Lazy version of children: each state is only created when the
+        iteration reaches it, so a depth first search that keeps one of
+        these per level of its path holds just the states of the path.
+
+        Yields:
+            KlotskiState: Reachable states.
+        """
+        for move in self.iter_moves():
+            yield self.do_move(move)
 
-        return [self._do_move(m) for m in moves]
-    
     def is_complete(self):
         """
         Checks if the state is a final one. It is when all the
-        goal squares are filled with Cells of id 0.
+        goal squares are filled with cells of id 0.
 
         Returns:
             boolean: True if complete, False if not.
         """
-        for row, col in self.goals:
-            if not self.board[row][col].is_red_piece():
+        for index in self.layout.goal_indexes:
+            if self.board[index] != BoardLayout.RED:
                 return False
         return True
@@ -0,0 +1,271 @@
+import mmap
+import os
+import struct
+
+
+class InvalidLevel(Exception):
+    """
+    Raised when a level, from a board file or a level pack, breaks the
+    rules of the game's boards.
+    """
+    pass
+
+
+def validate_level(goals, proto_board):
+    """
+    Checks that a level can be played: the board is a non-empty
+    rectangle with at least one empty square, every piece is a single
+    polyomino (its squares connected through their sides), there's a
+    red piece (id 0), and the goals are inside the board, distinct and
+    coverable by the red piece all at once.
+
+    Args:
+        goals (list of 2D tuples): The (row, col) goal squares.
+
+        proto_board (int matrix): The piece ids, -1 for empty squares.
+
+    Raises:
+        InvalidLevel: With the first rule broken.
+    """
+    if not proto_board or not proto_board[0]:
+        raise InvalidLevel('The board is empty')
+    n_rows, n_cols = len(proto_board), len(proto_board[0])
+    if any(len(row) != n_cols for row in proto_board):
+        raise InvalidLevel('The board rows have different lengths')
+
+    pieces = dict()
+    n_empties = 0
+    for i, row in enumerate(proto_board):
+        for j, cell in enumerate(row):
+            if cell == -1:
+                n_empties += 1
+            elif 0 <= cell <= 254:
+                pieces.setdefault(cell, []).append((i, j))
+            else:
+                raise InvalidLevel(f'Invalid piece id {cell} at ({i}, {j})')
+    if n_empties == 0:
+        raise InvalidLevel('The board has no empty squares')
+    if 0 not in pieces:
+        raise InvalidLevel('The board has no red piece')
+
+    for piece_id, cells in pieces.items():
+        # flood fill from one square through the side neighbours
+        remaining = set(cells)
+        stack = [remaining.pop()]
+        while stack:
+            i, j = stack.pop()
+            for neighbour in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+                if neighbour in remaining:
+                    remaining.remove(neighbour)
+                    stack.append(neighbour)
+        if remaining:
+            raise InvalidLevel(f'Piece {piece_id} is not connected')
+
+    if not goals:
+        raise InvalidLevel('The level has no goals')
+    if len(set(goals)) != len(goals):
+        raise InvalidLevel('The level has repeated goals')
+    for row, col in goals:
+        if not (0 <= row < n_rows and 0 <= col < n_cols):
+            raise InvalidLevel(f'Goal ({row}, {col}) is outside of the board')
+
+    # some placement of the red piece inside the board must cover every
+    # goal; each one puts one of its squares on the first goal
+    red = pieces[0]
+    first_row, first_col = goals[0]
+    for red_row, red_col in red:
+        d_row, d_col = first_row - red_row, first_col - red_col
+        placed = {(i + d_row, j + d_col) for i, j in red}
+        if all(0 <= i < n_rows and 0 <= j < n_cols for i, j in placed) and placed.issuperset(goals):
+            break
+    else:
+        raise InvalidLevel('The red piece can not cover every goal at once')
+
+
+class LevelPack:
+    """
+    Many levels stored in one binary file, read through a memory map
+    so that a level is only parsed, and validated, when it's asked for.
+
+    Layout, little-endian:
+        header: b'KLPK', version (u8), amount of levels (u32)
+        index: offset of each level record from the file start (u32)
+        record: name length (u8), name (utf-8), rows (u8), cols (u8),
+            amount of goals (u8), amount of empty squares (u16),
+            goals as (row, col) byte pairs, then one byte per square in
+            row-major order, the piece id + 1 or 0 for an empty square.
+    """
+
+    magic = b'KLPK'
+    version = 1
+    header = struct.Struct('<4sBI')
+    offset = struct.Struct('<I')
+    record = struct.Struct('<BBBH')
+
+    def __init__(self, file_path):
+        """
+        Opens a level pack. Only the header is read here.
+
+        Args:
+            file_path (str): The pack file.
+
+        Raises:
+            InvalidLevel: If the file isn't a level pack.
+        """
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can't be mapped
+                raise InvalidLevel(f'{file_path} is empty')
+
+        try:
+            magic, version, self.n_levels = self.header.unpack_from(self.data, 0)
+        except struct.error:
+            raise InvalidLevel(f'{file_path} is too short to be a level pack')
+        if magic != self.magic or version != self.version:
+            raise InvalidLevel(f'{file_path} is not a version {self.version} level pack')
+        if self.header.size + self.n_levels * self.offset.size > len(self.data):
+            raise InvalidLevel(f'{file_path} is truncated')
+
+        self._names = None
+
+    def __len__(self):
+        return self.n_levels
+
+    def _record_offset(self, index):
+        if not 0 <= index < self.n_levels:
+            raise IndexError(index)
+        return self.offset.unpack_from(self.data, self.header.size + index * self.offset.size)[0]
+
+    def name(self, index):
+        """
+        Reads the name of a level, without parsing the rest of it.
+        """
+        start = self._record_offset(index)
+        try:
+            length = self.data[start]
+            return self.data[start + 1:start + 1 + length].decode()
+        except (IndexError, UnicodeDecodeError):
+            raise InvalidLevel(f'Level {index} is truncated')
+
+    def names(self):
+        """
+        Returns:
+            list of str: The name of every level, in the pack's order.
+        """
+        if self._names is None:
+            self._names = [self.name(i) for i in range(self.n_levels)]
+        return self._names
+
+    def __getitem__(self, index):
+        """
+        Parses and validates a level.
+
+        Args:
+            index (int): Position of the level in the pack.
+
+        Raises:
+            InvalidLevel: If the record is truncated or the level breaks
+            the rules checked by validate_level.
+
+        Returns:
+            tuple: The name, the sorted goals and the id matrix of the
+            level, as Klotski.load_level takes them.
+        """
+        data = self.data
+        position = self._record_offset(index)
+        try:
+            length = data[position]
+            name = data[position + 1:position + 1 + length].decode()
+            position += 1 + length
+
+            n_rows, n_cols, n_goals, n_empties = self.record.unpack_from(data, position)
+            position += self.record.size
+
+            goals_end = position + 2 * n_goals
+            cells_end = goals_end + n_rows * n_cols
+            if cells_end > len(data):
+                raise InvalidLevel(f'Level {index} is truncated')
+
+            goals = sorted(
+                (data[position + 2 * g], data[position + 2 * g + 1]) for g in range(n_goals))
+            cells = data[goals_end:cells_end]
+        except (IndexError, UnicodeDecodeError, struct.error):
+            raise InvalidLevel(f'Level {index} is truncated')
+
+        proto_board = [[cell - 1 for cell in cells[r * n_cols:(r + 1) * n_cols]] for r in range(n_rows)]
+
+        validate_level(goals, proto_board)
+        if sum(row.count(-1) for row in proto_board) != n_empties:
+            raise InvalidLevel(f'Level {name} does not have the amount of empty squares it declares')
+
+        return name, goals, proto_board
+
+    def __iter__(self):
+        """
+        Streams the levels of the pack, parsing each one when reached.
+
+        Yields:
+            tuple: The name, goals and id matrix of each level.
+        """
+        for i in range(self.n_levels):
+            yield self[i]
+
+    def index(self, name):
+        """
+        Position of the level with a given name.
+
+        Raises:
+            KeyError: If there's no level with the name.
+        """
+        try:
+            return self.names().index(name)
+        except ValueError:
+            raise KeyError(name)
+
+    def close(self):
+        self.data.close()
+
+    @classmethod
+    def write(cls, file_path, levels):
+        """
+        Writes a level pack. Every level is validated first.
+
+        Args:
+            file_path (str): The pack file.
+
+            levels (iterable of tuples): The name, goals and id matrix
+            of each level.
+
+        Returns:
+            int: Amount of levels written.
+        """
+        records = []
+        for name, goals, proto_board in levels:
+            validate_level(goals, proto_board)
+            encoded_name = name.encode()
+            record = bytearray([len(encoded_name)]) + encoded_name
+            record += cls.record.pack(len(proto_board), len(proto_board[0]), len(goals),
+                                      sum(row.count(-1) for row in proto_board))
+            for row, col in goals:
+                record += bytes((row, col))
+            for row in proto_board:
+                record += bytes(cell + 1 for cell in row)
+            records.append(bytes(record))
+
+        folder = os.path.dirname(file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(file_path, 'wb') as f:
+            f.write(cls.header.pack(cls.magic, cls.version, len(records)))
+            position = cls.header.size + len(records) * cls.offset.size
+            for record in records:
+                f.write(cls.offset.pack(position))
+                position += len(record)
+            for record in records:
+                f.write(record)
+
+        return len(records)
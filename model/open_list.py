@@ -0,0 +1,119 @@
+from itertools import count
+import heapq
+
+
+class OpenList:
+    """
+    The priority queue of the best-first searches. The value of each
+    node is computed once, when it's pushed, and stored in the heap
+    entry as (f, tie_breaker, g, key, node), so comparing entries never
+    touches the nodes themselves. Ties are broken by insertion order.
+
+    When pushed with a key, the best g (the amount of moves from the
+    initial state) seen for that key is tracked: pushes that don't
+    improve it are ignored, and entries left behind by an improvement
+    are dropped when popped (lazy deletion), which takes the place of
+    a decrease-key operation.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.tie_breaker = count()
+        self.best_g = dict()
+
+    def __len__(self):
+        """
+        Amount of entries in the heap, including the stale ones.
+        """
+        return len(self.heap)
+
+    def push(self, node, f, g=0, key=None):
+        """
+        Adds a node to the open list.
+
+        Args:
+            node (KlotskiState): The node to be added.
+
+            f (float): The node's value; lower values are popped first.
+
+            g (int, optional): The node's amount of moves from the
+            initial state. Defaults to 0.
+
+            key (int, optional): The node's canonical key, needed to
+            track its best g. Defaults to None, for no tracking.
+
+        Returns:
+            boolean: True if the node was added, False if the same key
+            was already reached with a g as good as this one.
+        """
+        if key is not None:
+            best = self.best_g.get(key)
+            if best is not None and best <= g:
+                return False
+            self.best_g[key] = g
+
+        heapq.heappush(self.heap, (f, next(self.tie_breaker), g, key, node))
+        return True
+
+    def push_batch(self, nodes, fs, gs=None, keys=None):
+        """
+        Adds several nodes to the open list, as push does for each one.
+
+        Args:
+            nodes (list of KlotskiState): The nodes to be added.
+
+            fs (list of float): The value of each node.
+
+            gs (list of int, optional): The amount of moves of each node.
+            Defaults to None, for 0.
+
+            keys (list of int, optional): The canonical key of each node.
+            Defaults to None, for no tracking.
+
+        Returns:
+            int: Amount of nodes added.
+        """
+        if gs is None:
+            gs = [0] * len(nodes)
+        if keys is None:
+            heap = self.heap
+            tie_breaker = self.tie_breaker
+            for node, f, g in zip(nodes, fs, gs):
+                heapq.heappush(heap, (f, next(tie_breaker), g, None, node))
+            return len(nodes)
+
+        return sum(self.push(node, f, g, key) for node, f, g, key in zip(nodes, fs, gs, keys))
+
+    def truncate(self, size):
+        """
+        Drops the entries of highest value, keeping only the given
+        amount of them. The best g of the dropped nodes is kept, so they
+        are only pushed again if reached with fewer moves.
+
+        Args:
+            size (int): Amount of entries kept.
+
+        Returns:
+            int: Amount of entries dropped.
+        """
+        dropped = len(self.heap) - size
+        if dropped <= 0:
+            return 0
+        # a sorted list is already a valid heap
+        self.heap = heapq.nsmallest(size, self.heap)
+        return dropped
+
+    def pop(self):
+        """
+        Removes and returns the node of lowest value, skipping the ones
+        reached again later with a lower g.
+
+        Returns:
+            KlotskiState: The node, or None if the list is exhausted.
+        """
+        while self.heap:
+            _, _, g, key, node = heapq.heappop(self.heap)
+            if key is not None and self.best_g[key] < g:
+                continue
+            return node
+        return None
@@ -0,0 +1,280 @@
+import multiprocessing
+import queue
+import signal
+import threading
+import zlib
+
+from model.board_layout import BoardLayout
+from model.instrumentation import NullInstrumentation
+from model.klotski_state import KlotskiState
+from model.visited_set import VisitedSet
+
+
+# seconds a worker waits for a message before checking that the
+# coordinator is still alive
+poll_interval = 1
+
+# seconds the coordinator waits for a worker to stop before killing it
+stop_timeout = 1
+
+
+def _raise_exit(signum, frame):
+    """
+    SIGTERM handler of the coordinator, turning the signal into an
+    exception so that its workers are stopped on the way out.
+    """
+    raise SystemExit(128 + signum)
+
+
+def shard_of(board, canonical, n_shards):
+    """
+    Shard that owns a board. The checksum of the canonical board is
+    used instead of hash(), as the latter isn't the same across
+    processes for bytes.
+
+    Args:
+        board (bytes): The encoded board.
+
+        canonical (function): Gives the canonical board of a board, as
+        VisitedSet.canonical does.
+
+        n_shards (int): Amount of shards.
+
+    Returns:
+        int: Index of the shard.
+    """
+    return zlib.crc32(canonical(board)) % n_shards
+
+
+def _shard_worker(index, n_shards, catalog, canonical, inboxes, connection):
+    """
+    Loop of a worker process. Each worker owns the states of its shard:
+    it keeps their visited set and the part of the frontier made of
+    them, and sends the children it generates straight to the inbox of
+    the shard that owns each one.
+
+    Commands received through the connection:
+        ('seed', board): Takes board as the initial state.
+        ('layer',): Expands its frontier and builds the next one from
+            the children sent by every worker, replying with its size,
+            a final board among them, if any, and the amount of children
+            it generated and of the ones it received already visited.
+        ('parent', board): Replies with the board board was reached from.
+        ('stop',): Ends the loop.
+
+    The loop also ends when the connection is closed or the coordinator
+    dies without stopping it, so no worker outlives the search.
+    """
+    # the coordinator's SIGTERM handler is inherited through fork
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    coordinator = multiprocessing.parent_process()
+    goal_indexes = catalog.layout.goal_indexes
+    inbox = inboxes[index]
+
+    # canonical board -> (board, parent board)
+    visited = dict()
+    frontier = []
+
+    while True:
+        try:
+            while not connection.poll(poll_interval):
+                if not coordinator.is_alive():
+                    return
+            command = connection.recv()
+        except EOFError:
+            break
+
+        if command[0] == 'seed':
+            board = command[1]
+            visited[canonical(board)] = (board, None)
+            frontier = [board]
+
+        elif command[0] == 'layer':
+            outgoing = [[] for _ in range(n_shards)]
+            generated = 0
+            deduplicated = 0
+            for board in frontier:
+                children = KlotskiState(board, catalog).children()
+                generated += len(children)
+                for child in children:
+                    outgoing[shard_of(child.board, canonical, n_shards)].append((child.board, board))
+            for i, batch in enumerate(outgoing):
+                inboxes[i].put(batch)
+
+            frontier = []
+            goal = None
+            # one batch comes from every worker, this one included
+            for _ in range(n_shards):
+                while True:
+                    try:
+                        batch = inbox.get(timeout=poll_interval)
+                        break
+                    except queue.Empty:
+                        if not coordinator.is_alive():
+                            return
+                for board, parent in batch:
+                    board_key = canonical(board)
+                    if board_key in visited:
+                        deduplicated += 1
+                        continue
+                    visited[board_key] = (board, parent)
+                    frontier.append(board)
+                    if goal is None and all(board[g] == BoardLayout.RED for g in goal_indexes):
+                        goal = board
+            connection.send((len(frontier), goal, generated, deduplicated))
+
+        elif command[0] == 'parent':
+            connection.send(visited[canonical(command[1])][1])
+
+        elif command[0] == 'stop':
+            break
+
+
+class ParallelBFS:
+    """
+    Breadth first search whose layers are expanded by a pool of worker
+    processes. States are partitioned by the checksum of their canonical
+    board, the same one VisitedSet keys them by, mirrors included on
+    symmetric levels. Each worker keeps the frontier and visited set of
+    its own shard, so no structure is shared between processes. Only
+    the encoded boards are exchanged between them.
+
+    The workers are stopped however the search ends: the coordinator
+    turns SIGTERM into an exception while it runs, so terminating it (as
+    BackgroundSearch does on cancel or timeout) still stops them, and
+    they end by themselves if it dies anyway.
+    """
+
+    def __init__(self, root, n_workers=None, instrumentation=None, progress=None):
+        """
+        Args:
+            root (KlotskiState): The initial state.
+
+            n_workers (int, optional): Amount of worker processes.
+            Defaults to None, for the amount of CPUs.
+
+            instrumentation (NullInstrumentation, optional): Gets the
+            nodes generated and deduplicated by the workers and the
+            frontier size, after each layer. Defaults to None, for none.
+
+            progress (function, optional): Called after each layer with
+            the nodes expanded and the frontier size, as the progress
+            callback of Klotski. Defaults to None.
+        """
+        self.root = root
+        self.catalog = root.catalog
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.instrumentation = instrumentation or NullInstrumentation()
+        self.progress = progress
+        self.canonical = VisitedSet(root).canonical
+        self.expanded_nodes = 0
+
+    def _shard_of(self, board):
+        return shard_of(board, self.canonical, self.n_workers)
+
+    def run(self):
+        """
+        Runs the search.
+
+        Returns:
+            KlotskiState: A final state of the game, with the least
+            amount of moves.
+        """
+        root = self.root
+        self.expanded_nodes = 0
+        if root.is_complete():
+            return root
+
+        # signal handlers can only be set from the main thread
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, _raise_exit)
+
+        inboxes = [multiprocessing.Queue() for _ in range(self.n_workers)]
+        connections = []
+        processes = []
+        try:
+            for i in range(self.n_workers):
+                parent_end, child_end = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_shard_worker,
+                    args=(i, self.n_workers, self.catalog, self.canonical, inboxes, child_end),
+                    daemon=True)
+                process.start()
+                # only the worker keeps its end, so it gets EOFError
+                # once the coordinator's end is closed
+                child_end.close()
+                connections.append(parent_end)
+                processes.append(process)
+
+            connections[self._shard_of(root.board)].send(('seed', root.board))
+
+            frontier_size = 1
+            goal = None
+            while frontier_size and goal is None:
+                self.expanded_nodes += frontier_size
+                for connection in connections:
+                    connection.send(('layer',))
+
+                frontier_size = 0
+                for connection in connections:
+                    size, board, generated, deduplicated = connection.recv()
+                    frontier_size += size
+                    if goal is None and board is not None:
+                        goal = board
+                    self.instrumentation.count('generated', generated)
+                    self.instrumentation.count('deduplicated', deduplicated)
+
+                self.instrumentation.sample(self.expanded_nodes, frontier_size)
+                if self.progress is not None:
+                    self.progress(self.expanded_nodes, frontier_size)
+
+            if goal is None:
+                return None
+            return self._rebuild_path(goal, connections)
+
+        finally:
+            for connection in connections:
+                try:
+                    connection.send(('stop',))
+                except OSError:
+                    pass
+                connection.close()
+            # a worker waiting for the batches of a layer never reads
+            # the stop command
+            for process in processes:
+                process.join(stop_timeout)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+
+    def _rebuild_path(self, goal, connections):
+        """
+        Asks the workers for the parent of each board from the goal
+        back to the initial state, and replays the path from the
+        initial state so the result has its usual parent references.
+
+        Args:
+            goal (bytes): The final board found.
+
+            connections (list of Connection): Connections to the workers.
+
+        Returns:
+            KlotskiState: The final state.
+        """
+        boards = [goal]
+        while True:
+            connection = connections[self._shard_of(boards[-1])]
+            connection.send(('parent', boards[-1]))
+            parent = connection.recv()
+            if parent is None:
+                break
+            boards.append(parent)
+        boards.reverse()
+
+        state = self.root
+        for board in boards[1:]:
+            state = next(child for child in state.children() if child.board == board)
+        return state
@@ -0,0 +1,285 @@
+from operator import itemgetter
+
+from model.board_layout import BoardLayout
+from model.heuristics import HeuristicTables
+
+
+class PieceCatalog:
+    """
+    Per level catalog of the pieces, built once from the initial
+    board. It stores the shape and size of each piece and, for every
+    position a shape can be placed at, the cells it covers and the
+    moves it can do, so that the move generation becomes a matter of
+    table lookups. Any polyomino shape is supported.
+
+    A piece position is given by its anchor, the index of its first
+    cell in row-major order.
+    """
+
+    def __init__(self, board, layout):
+        """
+        Args:
+            board (bytes): The encoded initial board of the level.
+
+            layout (BoardLayout): The geometry of the board.
+        """
+        self.layout = layout
+
+        piece_cells = dict()
+        for i, code in enumerate(board):
+            piece_cells.setdefault(code, []).append(i)
+
+        self.n_empties = len(piece_cells.pop(BoardLayout.EMPTY, []))
+        if BoardLayout.RED not in piece_cells:
+            raise Exception('The board has no red piece')
+
+        self.codes = tuple(sorted(piece_cells))
+        self.n_codes = max(self.codes) + 1
+        self.initial_anchors = tuple(
+            piece_cells[code][0] if code in piece_cells else -1 for code in range(self.n_codes))
+
+        # shape of each piece, as offsets of its cells to its anchor
+        self.shapes = [None] * self.n_codes
+        self.sizes = [0] * self.n_codes
+        for code, cells in piece_cells.items():
+            anchor_row, anchor_col = layout.coords[cells[0]]
+            self.shapes[code] = tuple(
+                (row - anchor_row, col - anchor_col) for row, col in (layout.coords[c] for c in cells))
+            self.sizes[code] = len(cells)
+
+        # the red piece is kept apart from the others, as the goals
+        # depend on it; the other shapes are numbered after it
+        other_shapes = sorted(set(self.shapes[code] for code in self.codes if code != BoardLayout.RED))
+        self.shape_classes = {shape: i + 2 for i, shape in enumerate(other_shapes)}
+
+        # byte translation table from piece codes to shape class codes
+        table = bytearray(range(256))
+        for code in self.codes:
+            if code != BoardLayout.RED:
+                table[code] = self.shape_classes[self.shapes[code]]
+        self.key_table = bytes(table)
+
+        # pieces of the same shape share the same tables
+        tables = dict()
+        self.cells = [None] * self.n_codes
+        self.moves = [None] * self.n_codes
+        for code in self.codes:
+            shape = self.shapes[code]
+            if shape not in tables:
+                tables[shape] = self._build_tables(shape)
+            self.cells[code], self.moves[code] = tables[shape]
+
+        # cell of each cell in the left-right mirrored board
+        self.mirror_cells = tuple(
+            layout.index(row, layout.max_col - col) for row, col in layout.coords)
+        self._mirror_getter = itemgetter(*self.mirror_cells)
+        self.mirror_table = self._build_mirror_table()
+
+        self.heuristic_tables = HeuristicTables(self)
+
+    def _build_tables(self, shape):
+        """
+        Computes the cells a shape covers at each anchor, and the
+        moves it can do from there.
+
+        Args:
+            shape (tuple of 2D tuples): The (row, col) offsets of the
+            shape's cells to its anchor.
+
+        Returns:
+            tuple: The list of cells per anchor (None where the shape
+            doesn't fit in the board) and the list of moves per anchor.
+            The moves are a dict from direction to a tuple made of the
+            new anchor, the cells that must be empty for the move to
+            be done and the cells the piece leaves empty.
+        """
+        layout = self.layout
+
+        cells = [None] * layout.size
+        for anchor, (anchor_row, anchor_col) in enumerate(layout.coords):
+            placed = []
+            for row_sum, col_sum in shape:
+                row, col = anchor_row + row_sum, anchor_col + col_sum
+                if not (0 <= row <= layout.max_row and 0 <= col <= layout.max_col):
+                    break
+                placed.append(layout.index(row, col))
+            else:
+                cells[anchor] = tuple(placed)
+
+        moves = [None] * layout.size
+        for anchor, placed in enumerate(cells):
+            if placed is None:
+                continue
+
+            moves[anchor] = dict()
+            for dir in layout.possible_directions:
+                new_anchor = layout.neighbors[dir][anchor]
+                if new_anchor < 0 or cells[new_anchor] is None:
+                    continue
+                # a shape fits at the new anchor only if every cell moved
+                # stays in the board, as the anchor keeps its relative place
+                new_placed = cells[new_anchor]
+                required = tuple(c for c in new_placed if c not in placed)
+                vacated = tuple(c for c in placed if c not in new_placed)
+                moves[anchor][dir] = (new_anchor, required, vacated)
+
+        return cells, moves
+
+    @staticmethod
+    def _mirror_shape(shape):
+        """
+        Mirrors a shape left to right, normalizing it to its new anchor.
+        """
+        cells = sorted((row, -col) for row, col in shape)
+        anchor_row, anchor_col = cells[0]
+        return tuple((row - anchor_row, col - anchor_col) for row, col in cells)
+
+    def _build_mirror_table(self):
+        """
+        Checks whether the level is left-right symmetric: the goals are
+        their own mirror, the red piece too, and every other shape has
+        as many pieces as its mirror.
+
+        Returns:
+            bytes: Translation table from each shape class code to the
+            class code of its mirror, or None if the level isn't
+            symmetric.
+        """
+        layout = self.layout
+        if set(layout.goals) != set((row, layout.max_col - col) for row, col in layout.goals):
+            return None
+
+        red_shape = self.shapes[BoardLayout.RED]
+        if self._mirror_shape(red_shape) != red_shape:
+            return None
+
+        counts = dict()
+        for code in self.codes:
+            if code != BoardLayout.RED:
+                counts[self.shapes[code]] = counts.get(self.shapes[code], 0) + 1
+
+        table = bytearray(range(256))
+        for shape, shape_class in self.shape_classes.items():
+            mirrored = self._mirror_shape(shape)
+            if counts.get(mirrored) != counts[shape]:
+                return None
+            table[shape_class] = self.shape_classes[mirrored]
+        return bytes(table)
+
+    def mirror(self, board):
+        """
+        Mirrors a board left to right. Piece codes are kept, so for a
+        canonical board the shape classes still need to be translated
+        with mirror_table.
+
+        Args:
+            board (bytes): Encoded board.
+
+        Returns:
+            bytes: The mirrored board.
+        """
+        return bytes(self._mirror_getter(board))
+
+    def final_boards(self):
+        """
+        Enumerates every board of the level in which the red piece
+        covers all of the goals. Pieces of the same shape are only
+        placed in one of their orders, as the others lead to the same
+        canonical board.
+
+        Yields:
+            bytes: Encoded final boards.
+        """
+        layout = self.layout
+        goal_indexes = set(layout.goal_indexes)
+
+        groups = dict()
+        for code in self.codes:
+            if code != BoardLayout.RED:
+                groups.setdefault(self.shapes[code], []).append(code)
+        groups = list(groups.values())
+        used = [0] * len(groups)
+
+        board = bytearray(layout.size)
+        filled = [False] * layout.size
+
+        def place(cells, code):
+            for c in cells:
+                board[c] = code
+                filled[c] = True
+
+        def remove(cells):
+            for c in cells:
+                board[c] = BoardLayout.EMPTY
+                filled[c] = False
+
+        def fill(cell, empties_left):
+            while cell < layout.size and filled[cell]:
+                cell += 1
+            if cell == layout.size:
+                yield bytes(board)
+                return
+
+            if empties_left:
+                filled[cell] = True
+                yield from fill(cell + 1, empties_left - 1)
+                filled[cell] = False
+
+            # the first free cell can only be the anchor of the piece
+            # that covers it
+            for i, codes in enumerate(groups):
+                if used[i] == len(codes):
+                    continue
+                code = codes[used[i]]
+                cells = self.cells[code][cell]
+                if cells is None or any(filled[c] for c in cells):
+                    continue
+
+                place(cells, code)
+                used[i] += 1
+                yield from fill(cell + 1, empties_left)
+                used[i] -= 1
+                remove(cells)
+
+        for red_cells in self.cells[BoardLayout.RED]:
+            if red_cells is None or not goal_indexes.issubset(red_cells):
+                continue
+            place(red_cells, BoardLayout.RED)
+            yield from fill(0, self.n_empties)
+            remove(red_cells)
+
+    def relabel(self, board):
+        """
+        Converts a board with the same pieces as the level, but that may
+        use other ids for them, to the ids of the level's pieces with
+        the same shape.
+
+        Args:
+            board (bytes): Encoded board to be converted.
+
+        Raises:
+            Exception: If the board pieces differ from the level's.
+
+        Returns:
+            bytes: The board using the level's piece ids.
+        """
+        other = PieceCatalog(board, self.layout)
+        if other.n_empties != self.n_empties \
+                or other.shapes[BoardLayout.RED] != self.shapes[BoardLayout.RED]:
+            raise Exception('The board does not have the same pieces as the level')
+
+        free_codes = dict()
+        for code in self.codes:
+            free_codes.setdefault(self.shapes[code], []).append(code)
+
+        table = bytearray(range(256))
+        for code in other.codes:
+            codes = free_codes.get(other.shapes[code])
+            if not codes:
+                raise Exception('The board does not have the same pieces as the level')
+            table[code] = codes.pop(0)
+
+        if any(free_codes.values()):
+            raise Exception('The board does not have the same pieces as the level')
+
+        return board.translate(table)
@@ -0,0 +1,94 @@
+import sys
+
+
+class SearchBudgetExceeded(Exception):
+    """
+    Raised when a search runs out of its node or memory budget before
+    reaching a final state.
+    """
+
+    def __init__(self, reason, expanded_nodes, memory_used):
+        """
+        Args:
+            reason (str): Which of the budgets ran out.
+
+            expanded_nodes (int): Nodes expanded up to that point.
+
+            memory_used (int): Estimated memory in use, in bytes.
+        """
+        super().__init__(
+            f'Search budget exhausted ({reason}): {expanded_nodes} nodes expanded, '
+            f'~{memory_used} bytes in use')
+        self.reason = reason
+        self.expanded_nodes = expanded_nodes
+        self.memory_used = memory_used
+
+
+class SearchBudget:
+    """
+    Limits on how many nodes a search may expand and how much memory
+    its frontier and visited set may take. The memory is an estimate
+    made from the size of the root state, as measuring every state
+    would cost more than the search itself, and it's only checked
+    every few expansions.
+    """
+
+    check_interval = 1024
+
+    def __init__(self, root, max_nodes=None, max_memory=None):
+        """
+        Args:
+            root (KlotskiState): The initial state of the search.
+
+            max_nodes (int, optional): Maximum amount of expanded nodes.
+            Defaults to None, for no limit.
+
+            max_memory (int, optional): Maximum estimated memory, in
+            bytes. Defaults to None, for no limit.
+        """
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+        self.state_size = self.estimate_state_memory(root)
+
+    @staticmethod
+    def estimate_state_memory(state):
+        """
+        Estimates the memory taken by a single state, in bytes.
+
+        Args:
+            state (KlotskiState): The state to be measured.
+
+        Returns:
+            int: Estimated memory.
+        """
+        return sys.getsizeof(state) + sys.getsizeof(state.board) \
+            + sys.getsizeof(state.anchors) + sys.getsizeof(state.empties)
+
+    def memory_used(self, frontier_size, *visited_sets):
+        """
+        Estimated memory of a frontier plus its visited sets, in bytes.
+        """
+        return frontier_size * self.state_size + sum(v.memory_usage() for v in visited_sets)
+
+    def check(self, expanded_nodes, frontier_size, *visited_sets):
+        """
+        Checks that the search is still within its budget.
+
+        Args:
+            expanded_nodes (int): Nodes expanded so far.
+
+            frontier_size (int): Current amount of states in the frontier.
+
+            visited_sets (VisitedSet): The visited sets of the search.
+
+        Raises:
+            SearchBudgetExceeded: If any of the budgets ran out.
+        """
+        if self.max_nodes is not None and expanded_nodes > self.max_nodes:
+            raise SearchBudgetExceeded(
+                'node limit', expanded_nodes, self.memory_used(frontier_size, *visited_sets))
+
+        if self.max_memory is not None and expanded_nodes % self.check_interval == 0:
+            memory_used = self.memory_used(frontier_size, *visited_sets)
+            if memory_used > self.max_memory:
+                raise SearchBudgetExceeded('memory limit', expanded_nodes, memory_used)
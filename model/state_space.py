@@ -0,0 +1,344 @@
+from collections import deque
+import hashlib
+import json
+import os
+
+from model.board_layout import BoardLayout
+from model.klotski_state import KlotskiState
+
+
+class StateSpace:
+    """
+    Every configuration reachable from a level's initial board, with
+    each one's distance to the closest final state.
+
+    The distances are stored in a flat byte array indexed by a perfect
+    hash of the canonical states: a canonical board is fully described
+    by the sequence of shape classes (and empty squares) met in
+    row-major order at the first cell of each piece, so its rank among
+    the permutations of that multiset is a unique index. Cells of the
+    array that no reachable state ranks to hold the unreachable value.
+    """
+
+    unreachable = 255
+    cache_folder = 'cache/state_space/'
+
+    def __init__(self, catalog, distances, info):
+        """
+        Args:
+            catalog (PieceCatalog): The pieces and geometry of the level.
+
+            distances (bytearray): Distance to the goal by state rank.
+
+            info (dict): The state space summary, as returned by
+            get_info.
+        """
+        self.catalog = catalog
+        self.distances = distances
+        self.info = info
+
+        # amount of items of each class in the ranked sequences
+        counts = dict()
+        counts[BoardLayout.EMPTY] = catalog.n_empties
+        for code in catalog.codes:
+            item = catalog.key_table[code]
+            counts[item] = counts.get(item, 0) + 1
+        self.items = sorted(counts)
+        self.item_counts = counts
+        self.n_items = sum(counts.values())
+
+        self.n_ranks = self._multinomial(counts.values())
+
+    @staticmethod
+    def _multinomial(counts):
+        """
+        Amount of distinct permutations of a multiset with the given
+        item counts.
+        """
+        total = 0
+        result = 1
+        for count in counts:
+            for i in range(1, count + 1):
+                total += 1
+                result = result * total // i
+        return result
+
+    def rank(self, state):
+        """
+        Perfect hash of a state: the rank of its sequence of items among
+        every permutation of the level's multiset of items.
+
+        Args:
+            state (KlotskiState): State to be ranked.
+
+        Returns:
+            int: Rank, between 0 and n_ranks - 1.
+        """
+        board = state.board
+        anchors = state.anchors
+        key_table = self.catalog.key_table
+
+        counts = dict(self.item_counts)
+        remaining = self.n_items
+        permutations = self.n_ranks
+        rank = 0
+        for cell, code in enumerate(board):
+            if code != BoardLayout.EMPTY and anchors[code] != cell:
+                continue
+            item = key_table[code]
+            # permutations starting with each smaller item come first
+            for smaller in self.items:
+                if smaller == item:
+                    break
+                rank += permutations * counts[smaller] // remaining
+            permutations = permutations * counts[item] // remaining
+            counts[item] -= 1
+            remaining -= 1
+        return rank
+
+    def distance(self, state):
+        """
+        Amount of moves from a state to the closest final one.
+
+        Args:
+            state (KlotskiState): The state.
+
+        Returns:
+            int: Distance, or None if the state isn't reachable.
+        """
+        distance = self.distances[self.rank(state)]
+        return None if distance == self.unreachable else distance
+
+    def best_move(self, state):
+        """
+        The state an optimal move from the given state leads to.
+
+        Args:
+            state (KlotskiState): The state.
+
+        Returns:
+            KlotskiState: Next state of an optimal solution, or None if
+            the state is final or unreachable.
+        """
+        distance = self.distance(state)
+        if not distance:
+            return None
+
+        # the root of the path is used so that the undo of the last
+        # move isn't skipped
+        for child in KlotskiState(state.board, state.catalog).children():
+            if self.distance(child) == distance - 1:
+                return child
+        return None
+
+    def get_info(self):
+        """
+        Returns the summary of the state space: the amount of states,
+        of final states, the largest distance to the goal and the
+        diameter of the state graph.
+        """
+        return self.info
+
+    # =============================================================================
+    #                               ENUMERATION
+    # =============================================================================
+
+    @classmethod
+    def build(cls, root, max_diameter_bfs=200):
+        """
+        Enumerates the state space reachable from a state.
+
+        Args:
+            root (KlotskiState): The initial state of the level.
+
+            max_diameter_bfs (int, optional): Maximum amount of breadth
+            first searches run to compute the exact diameter; if they
+            aren't enough, the best lower bound is reported and marked
+            as not exact. Defaults to 200.
+
+        Returns:
+            StateSpace: The state space.
+        """
+        catalog = root.catalog
+        key_table = catalog.key_table
+
+        # breadth first enumeration, building the graph of the state
+        # indexes along the way
+        index = {root.board.translate(key_table): 0}
+        states = [KlotskiState(root.board, catalog)]
+        neighbors = []
+        for state in states:
+            adjascent = []
+            # states are made without a parent so no move is skipped
+            for child in state.children():
+                key = child.board.translate(key_table)
+                if key not in index:
+                    index[key] = len(states)
+                    states.append(KlotskiState(child.board, catalog))
+                adjascent.append(index[key])
+            neighbors.append(adjascent)
+
+        goals = [i for i, state in enumerate(states) if state.is_complete()]
+        goal_distances = cls._bfs(neighbors, goals)
+        if goals and max(goal_distances) >= cls.unreachable:
+            raise Exception('Distances too long to be stored in a byte')
+
+        space = cls(catalog, None, None)
+        distances = bytearray([cls.unreachable]) * space.n_ranks
+        for state, distance in zip(states, goal_distances):
+            if distance >= 0:
+                distances[space.rank(state)] = distance
+        space.distances = distances
+
+        diameter, exact = cls._diameter(neighbors, max_diameter_bfs)
+        space.info = {
+            'n_states': len(states),
+            'n_goal_states': len(goals),
+            'max_goal_distance': max(goal_distances) if goals else None,
+            'diameter': diameter,
+            'diameter_exact': exact,
+        }
+        return space
+
+    @staticmethod
+    def _bfs(neighbors, sources):
+        """
+        Breadth first search over the state graph.
+
+        Args:
+            neighbors (list of int lists): Adjascent indexes of each state.
+
+            sources (list of int): Indexes the search starts from.
+
+        Returns:
+            list of int: Distance of each state to the closest source,
+            -1 for the ones not reached.
+        """
+        distances = [-1] * len(neighbors)
+        queue = deque(sources)
+        for source in sources:
+            distances[source] = 0
+        while queue:
+            current = queue.popleft()
+            distance = distances[current] + 1
+            for n in neighbors[current]:
+                if distances[n] < 0:
+                    distances[n] = distance
+                    queue.append(n)
+        return distances
+
+    @classmethod
+    def _diameter(cls, neighbors, max_bfs):
+        """
+        Diameter of the state graph, found with the iFUB algorithm:
+        starting from a central state, the eccentricities of the states
+        on its farthest layers are computed until the largest one found
+        can't be beaten by the states on the remaining layers.
+
+        Args:
+            neighbors (list of int lists): Adjascent indexes of each state.
+
+            max_bfs (int): Maximum amount of breadth first searches.
+
+        Returns:
+            tuple: The diameter, or a lower bound on it, and whether it's
+            exact.
+        """
+        # double sweep to find a state near the center of the graph
+        distances = cls._bfs(neighbors, [0])
+        a = distances.index(max(distances))
+        distances = cls._bfs(neighbors, [a])
+        b = distances.index(max(distances))
+        lower = distances[b]
+        path_distances = cls._bfs(neighbors, [b])
+        center = min(range(len(neighbors)),
+                     key=lambda i: (abs(distances[i] - path_distances[i])
+                                    if distances[i] + path_distances[i] == lower else len(neighbors)))
+        n_bfs = 3
+
+        distances = cls._bfs(neighbors, [center])
+        n_bfs += 1
+        eccentricity = max(distances)
+        lower = max(lower, eccentricity)
+
+        layers = [[] for _ in range(eccentricity + 1)]
+        for i, d in enumerate(distances):
+            layers[d].append(i)
+
+        for level in range(eccentricity, 0, -1):
+            for state in layers[level]:
+                if n_bfs >= max_bfs:
+                    return lower, False
+                lower = max(lower, max(cls._bfs(neighbors, [state])))
+                n_bfs += 1
+            # every pair of states in the remaining layers is at most
+            # 2 * (level - 1) apart
+            if lower > 2 * (level - 1):
+                return lower, True
+        return lower, True
+
+    # =============================================================================
+    #                                 STORAGE
+    # =============================================================================
+
+    @classmethod
+    def cache_path(cls, root):
+        """
+        Path of the cache file of a level, identified by its canonical
+        initial board and goals.
+        """
+        layout = root.layout
+        description = repr((layout.n_rows, layout.n_cols, sorted(layout.goals),
+                            root.board.translate(root.catalog.key_table)))
+        digest = hashlib.sha1(description.encode()).hexdigest()
+        return os.path.join(cls.cache_folder, f'{digest}.bin')
+
+    def save(self, file_path):
+        """
+        Saves the state space to a file: a line with the JSON summary
+        followed by the raw distance array.
+        """
+        folder = os.path.dirname(file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(json.dumps(self.info).encode() + b'\n')
+            f.write(self.distances)
+
+    @classmethod
+    def load(cls, file_path, catalog):
+        """
+        Loads a state space saved with save.
+
+        Args:
+            file_path (str): The file path.
+
+            catalog (PieceCatalog): The pieces and geometry of the level.
+
+        Returns:
+            StateSpace: The state space.
+        """
+        with open(file_path, 'rb') as f:
+            info = json.loads(f.readline())
+            distances = bytearray(f.read())
+        return cls(catalog, distances, info)
+
+    @classmethod
+    def load_or_build(cls, root):
+        """
+        Loads the state space of a level from the cache, building and
+        saving it if it isn't there.
+
+        Args:
+            root (KlotskiState): The initial state of the level.
+
+        Returns:
+            StateSpace: The state space.
+        """
+        path = cls.cache_path(root)
+        if os.path.exists(path):
+            return cls.load(path, root.catalog)
+
+        space = cls.build(root)
+        space.save(path)
+        return space
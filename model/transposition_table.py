@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+
+class TranspositionTable:
+    """
+    Bounded table used by the iterative deepening searches. For each
+    state it keeps the least amount of moves with which it was reached
+    in the current iteration, to prune the states already explored
+    from a path at least as short, and the highest heuristic value
+    learned for it in past iterations. When full, the least recently
+    used entry is replaced.
+    """
+
+    def __init__(self, max_size):
+        """
+        Args:
+            max_size (int): Maximum amount of entries.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.iteration = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def new_iteration(self):
+        """
+        Starts a new iteration, after which the amounts of moves stored
+        in the previous ones no longer prune any state.
+        """
+        self.iteration += 1
+
+    def visit(self, key, g):
+        """
+        Records that a state is being reached with g moves.
+
+        Args:
+            key (int): Canonical key of the state.
+
+            g (int): Amount of moves from the initial state.
+
+        Returns:
+            boolean: True if the state should be explored, False if it
+            was already reached with g or fewer moves in this iteration.
+        """
+        entries = self.entries
+        entry = entries.get(key)
+        if entry is None:
+            entries[key] = [g, self.iteration, 0]
+            if len(entries) > self.max_size:
+                entries.popitem(last=False)
+            return True
+
+        entries.move_to_end(key)
+        if entry[1] == self.iteration and entry[0] <= g:
+            return False
+        entry[0] = g
+        entry[1] = self.iteration
+        return True
+
+    def learned(self, key):
+        """
+        Returns the heuristic value learned for a state, or 0 if none.
+        """
+        entry = self.entries.get(key)
+        return 0 if entry is None else entry[2]
+
+    def learn(self, key, h):
+        """
+        Raises the heuristic value learned for a state, if it's stored.
+
+        Args:
+            key (int): Canonical key of the state.
+
+            h (float): Lower bound on the moves left from the state.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and h > entry[2]:
+            entry[2] = h
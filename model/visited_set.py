@@ -0,0 +1,126 @@
+import sys
+
+
+class VisitedSet:
+    """
+    The set of already visited states of a search, stored as a flat
+    set of canonical integer keys. The key of a state replaces every
+    piece id by the id of its shape class, so boards that only differ
+    by which of two same shaped pieces sits where collapse into the
+    same entry. The red piece always has a class of its own, as the
+    goals depend on it.
+
+    When the level is left-right symmetric (see
+    PieceCatalog.mirror_table), a state and its mirror are equally far
+    from the goals, so the key is the smaller of the two canonical
+    boards and only one of them is ever explored. The states kept are
+    real ones, so the paths rebuilt from their parents need no mapping.
+    """
+
+    def __init__(self, root, use_symmetry=True):
+        """
+        Args:
+            root (KlotskiState): Any state of the level, whose piece
+            catalog gives the shape class of each piece.
+
+            use_symmetry (boolean, optional): Whether a state and its
+            mirror share the same key on symmetric levels. Defaults to
+            True.
+        """
+        self.catalog = root.catalog
+        self.key_table = root.catalog.key_table
+        self.mirror_table = root.catalog.mirror_table if use_symmetry else None
+        self.keys = set()
+
+    def canonical(self, board):
+        """
+        Returns the canonical board of a board, the bytes its key is
+        made from.
+
+        Args:
+            board (bytes): The encoded board.
+
+        Returns:
+            bytes: The canonical board.
+        """
+        canonical = board.translate(self.key_table)
+        if self.mirror_table is not None:
+            mirrored = self.catalog.mirror(canonical).translate(self.mirror_table)
+            if mirrored < canonical:
+                canonical = mirrored
+        return canonical
+
+    def key(self, state):
+        """
+        Returns the canonical key of a state.
+
+        Args:
+            state (KlotskiState): State to get the key of.
+
+        Returns:
+            int: The canonical key.
+        """
+        return int.from_bytes(self.canonical(state.board), 'big')
+
+    def add(self, state):
+        """
+        Marks a state as visited.
+
+        Args:
+            state (KlotskiState): State to be added.
+
+        Returns:
+            boolean: True if the state wasn't visited before, False
+            if it was.
+        """
+        key = self.key(state)
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    def __contains__(self, state):
+        return self.key(state) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def memory_usage(self):
+        """
+        Estimates the memory used by the set, in bytes. Every key of a
+        level has roughly the same size, so only one is measured.
+
+        Returns:
+            int: Estimated memory usage.
+        """
+        size = sys.getsizeof(self.keys)
+        if self.keys:
+            sample = next(iter(self.keys))
+            size += len(self.keys) * sys.getsizeof(sample)
+        return size
+
+
+class VisitedMap(VisitedSet):
+    """
+    A VisitedSet that also keeps the first state stored under each
+    key, for the searches that need to get back to it, as the
+    bidirectional one does when both sides meet.
+    """
+
+    def __init__(self, root, use_symmetry=True):
+        super().__init__(root, use_symmetry)
+        self.keys = dict()
+
+    def add(self, state):
+        key = self.key(state)
+        if key in self.keys:
+            return False
+        self.keys[key] = state
+        return True
+
+    def get(self, state):
+        """
+        Returns the stored state with the same key as the given one, or
+        None if there's none.
+        """
+        return self.keys.get(self.key(state))
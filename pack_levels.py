@@ -0,0 +1,41 @@
+"""
+Packs the board files of a folder into a single LevelPack file.
+
+Example:
+    python pack_levels.py inputs/set1/ levels/set1.klp
+"""
+import argparse
+import os
+
+from controller.controller import Controller
+from model.klotski import Klotski
+from model.level_pack import LevelPack
+
+
+def read_levels(folder):
+    """
+    Reads and validates every board file of a folder, in the same
+    order as Controller.get_level_names.
+
+    Yields:
+        tuple: The name, goals and id matrix of each level.
+    """
+    game = Klotski()
+    names = [x[:-len('.txt')] for x in os.listdir(folder) if x.endswith('.txt')]
+    for name in sorted(names, key=Controller.level_sort_key):
+        game.read_board(os.path.join(folder, f'{name}.txt'))
+        yield name, game.get_goals(), game.get_id_matrix()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Packs the board files of a folder into a level pack.')
+    parser.add_argument('folder')
+    parser.add_argument('output')
+    args = parser.parse_args()
+
+    n_levels = LevelPack.write(args.output, read_levels(args.folder))
+    print(f'Packed {n_levels} levels into {args.output}')
+
+
+if __name__ == '__main__':
+    main()
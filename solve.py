@@ -0,0 +1,48 @@
+"""
+Headless batch solver: runs a set of search algorithms over every
+board of a folder and saves the results.
+
+Example:
+    python solve.py -a bfs a_star_opt -j 4 -t 60 -m 1024 -o results/set1.csv
+"""
+import argparse
+
+from controller.batch_solver import BatchSolver
+from controller.controller import Controller
+
+
+# uninformed depth first searches, which can take hours on the larger
+# levels, only run when asked for
+exhaustive_algs = ('dfs', 'i_dfs')
+default_algs = [alg for alg in Controller.search_args if alg not in exhaustive_algs]
+
+default_timeout = 300
+
+# kept with the other generated files, out of the tracked tree
+output_path = 'cache/results.csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solves every board of a folder without the GUI.')
+    parser.add_argument('-i', '--inputs', default=Controller.inputs_folder,
+                        help='folder with the board files, or a level pack (default: %(default)s)')
+    parser.add_argument('-a', '--algs', nargs='+', default=default_algs, choices=list(Controller.search_args),
+                        help=f'algorithms to be run (default: all but {", ".join(exhaustive_algs)})')
+    parser.add_argument('-j', '--jobs', type=int, help='jobs run at the same time (default: CPUs)')
+    parser.add_argument('-t', '--timeout', type=float, default=default_timeout,
+                        help='time limit per job, in seconds, 0 for none (default: %(default)s)')
+    parser.add_argument('-m', '--max-memory', type=int, help='memory limit per job, in MB')
+    parser.add_argument('-o', '--output', default=output_path,
+                        help='output file, .csv or .json (default: %(default)s)')
+    args = parser.parse_args()
+
+    solver = BatchSolver(
+        args.inputs, args.algs, args.jobs, args.timeout or None,
+        args.max_memory * 2**20 if args.max_memory is not None else None)
+    rows = solver.run()
+    solver.save(rows, args.output)
+    print(f'Saved {len(rows)} results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import contextlib
+import io
+import unittest
+
+from controller.controller import Controller
+
+
+class SearchAlgTest(unittest.TestCase):
+    """
+    Controller.search_alg must store the solutions found, and nothing
+    for the searches that find none.
+    """
+
+    def setUp(self):
+        self.controller = Controller(solution_cache=False)
+        self.controller.load_game('board1')
+
+    def search(self, alg):
+        # search_alg prints its progress
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.controller.search_alg(alg)
+
+    def test_solution_is_stored(self):
+        self.assertTrue(self.search('bfs'))
+        self.assertTrue(self.controller.is_alg_ready('bfs'))
+        results = self.controller.get_results('bfs')
+        self.assertEqual(len(results['move_history']), results['n_moves'] + 1)
+
+    def test_no_solution(self):
+        # a beam of one state loses every way to the goal
+        self.controller.search_args = dict(Controller.search_args, beam=(12, 1, 2, 1))
+        self.assertFalse(self.search('beam'))
+        self.assertFalse(self.controller.is_alg_ready('beam'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import tempfile
+from time import sleep, time
+import unittest
+from unittest import mock
+
+from controller.controller import Controller
+from model.state_space import StateSpace
+
+
+class HintTest(unittest.TestCase):
+    """
+    Hints must be found without blocking the caller on the state space,
+    which is built in the background the first time a level asks for one.
+    """
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        patcher = mock.patch.object(StateSpace, 'cache_folder', folder.name + '/')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.controller = Controller(solution_cache=False)
+        self.addCleanup(self.controller.cancel_all_searches)
+        self.controller.load_game('board1')
+
+    def wait_for_hint(self, timeout=60):
+        end = time() + timeout
+        while time() < end:
+            hint = self.controller.get_hint()
+            if hint['status'] != 'running':
+                return hint
+            sleep(.05)
+        self.fail('the state space took too long to be built')
+
+    def test_hint_is_built_in_background(self):
+        self.assertIsNone(self.controller.get_hint())
+
+        self.controller.request_hint()
+        self.assertEqual(self.controller.get_hint()['status'], 'running')
+
+        hint = self.wait_for_hint()
+        self.assertEqual(hint['status'], 'ready')
+        n_moves = self.controller.game.bfs().depth
+        self.assertEqual(hint['n_moves'], n_moves - 1)
+
+        # the state space is in the cache now, for any later request
+        self.controller.load_game('board1')
+        self.controller.request_hint()
+        self.assertEqual(self.controller.get_hint(), hint)
+
+
+if __name__ == '__main__':
+    unittest.main()
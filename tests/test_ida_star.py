@@ -0,0 +1,89 @@
+import random
+import unittest
+from unittest import mock
+
+from model import klotski
+from model.klotski import Klotski
+from model.klotski_state import KlotskiState
+from model.state_space import StateSpace
+from model.transposition_table import TranspositionTable
+from model.visited_set import VisitedSet
+
+
+def random_states(game, n_states, n_moves, seed):
+    """
+    Boards reached by random walks from the initial state of a level.
+    """
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(n_states):
+        board = game.state.board
+        for _ in range(n_moves):
+            # a parentless state has every move, undos included
+            board = rng.choice(KlotskiState(board, game.catalog).children()).board
+        boards.append(board)
+    return boards
+
+
+def load(file_path):
+    game = Klotski()
+    game.read_board(file_path)
+    return game
+
+
+class IDAStarTest(unittest.TestCase):
+    """
+    IDA* must find the BFS optimum from any state, not only from the
+    initial ones, and only learn lower bounds of the moves left.
+    """
+
+    def check_optimal(self, file_path, n_states=6, n_moves=30, seed=0, **kwargs):
+        game = load(file_path)
+        for board in random_states(game, n_states, n_moves, seed):
+            game.state = KlotskiState(board, game.catalog)
+            expected = game.bfs()
+            result = game.ida_star(**kwargs)
+            self.assertIsNotNone(result)
+            self.assertTrue(result.is_complete())
+            self.assertEqual(result.depth, expected.depth)
+
+    def test_optimal_board1(self):
+        self.check_optimal('inputs/set1/board1.txt')
+
+    def test_optimal_board8(self):
+        self.check_optimal('inputs/set1/board8.txt', seed=1)
+
+    def test_optimal_small_table(self):
+        # evictions make states be learned and reached again more often
+        self.check_optimal('inputs/set1/board1.txt', seed=2, table_size=500)
+
+    def test_learned_values_are_lower_bounds(self):
+        game = load('inputs/set1/board8.txt')
+        space = StateSpace.load_or_build(game.state)
+        boards = dict()
+        overestimates = []
+
+        class RecordingVisitedSet(VisitedSet):
+            def key(self, state):
+                key = super().key(state)
+                boards[key] = state.board
+                return key
+
+        class CheckingTable(TranspositionTable):
+            def learn(self, key, h):
+                distance = space.distance(KlotskiState(boards[key], game.catalog))
+                if h > distance:
+                    overestimates.append((h, distance))
+                super().learn(key, h)
+
+        with mock.patch.object(klotski, 'VisitedSet', RecordingVisitedSet), \
+                mock.patch.object(klotski, 'TranspositionTable', CheckingTable):
+            for board in random_states(game, 10, 60, seed=0):
+                game.state = KlotskiState(board, game.catalog)
+                game.ida_star(use_pattern_database=False)
+
+        self.assertEqual(overestimates, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
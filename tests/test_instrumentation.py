@@ -0,0 +1,47 @@
+import unittest
+
+from model.instrumentation import SearchInstrumentation
+from model.klotski import Klotski
+
+
+class InstrumentationTest(unittest.TestCase):
+    """
+    Every search must report its nodes to the instrumentation, the
+    duplicates rejected by the open list included.
+    """
+
+    def record(self, method_name, *args):
+        game = Klotski()
+        game.read_board('inputs/set1/board8.txt')
+        game.instrumentation = SearchInstrumentation()
+        self.assertIsNotNone(getattr(game, method_name)(*args))
+        return game.instrumentation.get_report()[-1]
+
+    def check_counts(self, record):
+        self.assertGreater(record['expanded'], 0)
+        self.assertGreater(record['generated'], record['expanded'])
+        self.assertGreater(record['deduplicated'], 0)
+
+    def test_a_star(self):
+        record = self.record('a_star', 12, 1, 2)
+        self.check_counts(record)
+        self.assertIn('open_list', record['phases'])
+
+    def test_anytime_a_star(self):
+        record = self.record('anytime_a_star', 3, .5)
+        self.check_counts(record)
+        self.assertIn('visited', record['phases'])
+
+    def test_parallel_bfs(self):
+        record = self.record('parallel_bfs', 2)
+        self.check_counts(record)
+        self.assertTrue(record['frontier_samples'])
+
+    def test_external_bfs(self):
+        record = self.record('external_bfs')
+        self.check_counts(record)
+        self.assertTrue(record['frontier_samples'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from model.klotski import Klotski
+from model.level_pack import InvalidLevel, LevelPack, validate_level
+
+
+# an L shaped red piece, an L shaped piece and a domino
+polyomino_board = [
+    [0, 0, -1, -1],
+    [0, 1, -1, 2],
+    [-1, 1, 1, 2],
+    [-1, -1, -1, -1],
+]
+polyomino_goals = [(2, 2), (2, 3), (3, 2)]
+
+
+class ValidateLevelTest(unittest.TestCase):
+    """
+    validate_level must take any polyomino, and only reject the levels
+    that can't be played.
+    """
+
+    def test_polyominoes(self):
+        validate_level(polyomino_goals, polyomino_board)
+
+        game = Klotski()
+        game.load_level(polyomino_goals, polyomino_board)
+        self.assertIsNotNone(game.bfs())
+
+    def test_disconnected_piece(self):
+        board = [row[:] for row in polyomino_board]
+        board[3][3] = 1
+        with self.assertRaisesRegex(InvalidLevel, 'not connected'):
+            validate_level(polyomino_goals, board)
+
+    def test_uncoverable_goals(self):
+        # the L can't cover a straight line of three squares, and only
+        # covers two squares side by side with its top row, which can't
+        # be the bottom row of the board
+        for goals in ([(3, 0), (3, 1), (3, 2)], [(3, 2), (3, 3)]):
+            with self.assertRaisesRegex(InvalidLevel, 'cover'):
+                validate_level(goals, polyomino_board)
+
+
+class LevelPackTest(unittest.TestCase):
+    """
+    Opening a file that isn't a whole level pack must raise InvalidLevel.
+    """
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'levels.klp')
+
+    def write_bytes(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_round_trip(self):
+        LevelPack.write(self.path, [('poly', polyomino_goals, polyomino_board)])
+        pack = LevelPack(self.path)
+        self.assertEqual(pack[0], ('poly', sorted(polyomino_goals), polyomino_board))
+        pack.data.close()
+
+    def test_empty_file(self):
+        self.write_bytes(b'')
+        with self.assertRaises(InvalidLevel):
+            LevelPack(self.path)
+
+    def test_truncated_file(self):
+        LevelPack.write(self.path, [('poly', polyomino_goals, polyomino_board)])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        for size in (3, LevelPack.header.size + 2):
+            self.write_bytes(data[:size])
+            with self.assertRaises(InvalidLevel):
+                LevelPack(self.path)
+
+        # the header and index are whole, the record isn't
+        self.write_bytes(data[:-4])
+        pack = LevelPack(self.path)
+        with self.assertRaises(InvalidLevel):
+            pack[0]
+        pack.data.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
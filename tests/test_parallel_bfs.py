@@ -0,0 +1,69 @@
+import os
+from time import sleep, time
+import unittest
+
+from controller.background_search import BackgroundSearch
+
+
+def children_of(pid):
+    """
+    Pids of the live (not zombie) processes whose parent is pid.
+    """
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name, in parentheses, may have spaces
+        state, ppid = stat.rsplit(')', 1)[1].split()[:2]
+        if int(ppid) == pid and state != 'Z':
+            pids.append(int(entry))
+    return pids
+
+
+def is_running(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def wait_for(condition, timeout):
+    end = time() + timeout
+    while time() < end:
+        if condition():
+            return True
+        sleep(.05)
+    return condition()
+
+
+@unittest.skipUnless(os.path.isdir('/proc'), 'needs /proc to list the processes')
+class ParallelBFSCleanupTest(unittest.TestCase):
+    """
+    The worker processes of a parallel BFS must not outlive the search
+    when it's cancelled from a BackgroundSearch.
+    """
+
+    n_workers = 4
+
+    def test_cancel_stops_the_workers(self):
+        search = BackgroundSearch('inputs/set1/board45.txt', 'parallel_bfs', (self.n_workers,))
+        try:
+            self.assertTrue(wait_for(lambda: len(children_of(search.process.pid)) == self.n_workers, 5))
+            workers = children_of(search.process.pid)
+            self.assertEqual(search.poll(), 'running')
+        finally:
+            search.cancel()
+
+        self.assertEqual(search.status, 'cancelled')
+        self.assertTrue(wait_for(lambda: not any(is_running(pid) for pid in workers), 5),
+                        'worker processes left running')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,7 @@ class GUI:
     the game and its search algorithms.
     """
 
-    search_algs = ('greedy', 'a_star', 'dfs', 'i_dfs', 'bfs')
+    search_algs = ('greedy', 'a_star', 'a_star_opt', 'dfs', 'i_dfs', 'bfs', 'anytime_a_star')
 
     def __init__(self):
         """
@@ -49,10 +49,13 @@ class GUI:
             # Process player inputs.
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.controller.cancel_all_searches()
                     pygame.quit()
                     raise SystemExit
                 if event.type == pygame.MOUSEBUTTONUP:
                     self.click_action()
+                if event.type == pygame.KEYUP and event.key == pygame.K_h:
+                    self.controller.request_hint()
 
             # Do logical updates here.
             # ...
@@ -81,7 +84,12 @@ class GUI:
 
         for b, alg_name in self.search_buttons:
             if b.collidepoint(mouse_pos):
-                self.controller.search_alg(alg_name)
+                # a running search is cancelled by clicking it again
+                progress = self.controller.get_search_progress(alg_name)
+                if progress is not None and progress['status'] == 'running':
+                    self.controller.cancel_search(alg_name)
+                else:
+                    self.controller.start_search(alg_name)
                 return
             
         for b, alg_name in self.play_buttons:
@@ -89,13 +97,20 @@ class GUI:
                 self.controller.play(alg_name)
                 return
 
+        if self.hint_button.collidepoint(mouse_pos):
+            self.controller.request_hint()
+
     def draw(self):
         """
         This function calls a drawing function for each indivudal
         part of the screen.
         """
         # board
-        self.draw_board(*self.controller.get_current_board())
+        board, goals = self.controller.get_current_board()
+        self.draw_board(board, goals)
+
+        # hint
+        self.draw_hint(board)
 
         # divider
         self.draw_divider()
@@ -262,4 +277,83 @@ class GUI:
                 self.screen.blit(text_img, (start_width, 140))
 
                 self.play_buttons.append((play_b, alg_name))
+            else:
+                self.draw_search_progress(alg_name, start_width, button_width, button_height)
+
+    def draw_search_progress(self, alg_name, start_width, button_width, button_height):
+        """
+        Drawing function for the progress of a background search, and
+        the play button of the best solution an anytime search has found
+        so far, if it has one.
+        """
+        progress = self.controller.get_search_progress(alg_name)
+        if progress is None:
+            return
+
+        pygame.draw.rect(
+            self.screen, (120, 120, 120),
+            pygame.Rect(start_width, 40, button_width, 90)
+        )
+        lines = [progress['status'], f"{progress['expanded_nodes']} nodes",
+                 f"{round(progress['elapsed'], 1)} sec"]
+        if progress['best_n_moves'] is not None:
+            lines.append(f"best: {progress['best_n_moves']} moves")
+            lines.append(f"bound: {round(progress['best_bound'], 2)}")
+        elif progress['error'] is not None:
+            lines.append(progress['error'])
+        for i, line in enumerate(lines):
+            text_img = self.font11.render(line, True, (255, 255, 255))
+            self.screen.blit(text_img, (start_width, 40 + i * 14))
+
+        if progress['best_n_moves'] is not None:
+            play_b = pygame.draw.rect(
+                self.screen, (0, 200, 0),
+                pygame.Rect(start_width, 140, button_width, button_height)
+            )
+            text_img = self.font14.render('PLAY', True, (255, 255, 255))
+            self.screen.blit(text_img, (start_width, 140))
 
+            self.play_buttons.append((play_b, alg_name))
+
+    def draw_hint(self, board, square_size=80, button_width=85, button_height=20):
+        """
+        Drawing function for the hint button, also triggered with the H
+        key, and the hint: the squares the piece of the optimal move
+        goes to are outlined, or the status of the hint is shown while
+        the level's state space is built.
+        """
+        start_height = self.screen_height - button_height - 10
+        self.hint_button = pygame.draw.rect(
+            self.screen, (0, 200, 0),
+            pygame.Rect(10, start_height, button_width, button_height)
+        )
+        text_img = self.font14.render('HINT', True, (255, 255, 255))
+        self.screen.blit(text_img, (10, start_height))
+
+        hint = self.controller.get_hint()
+        if hint is None:
+            return
+
+        if hint['status'] != 'ready':
+            line = f"{hint['status']}: {hint['error']}" if hint['error'] is not None else 'building the hints...'
+        elif hint['board'] is None:
+            line = 'no move to be done'
+        else:
+            line = f"{hint['n_moves']} moves left after this one"
+
+            hint_board = hint['board']
+            margin = (self.board_width - (square_size * len(board[0]))) / 2
+            piece_id = next(hint_board[i][j] for i, row in enumerate(board) for j, cell in enumerate(row)
+                            if hint_board[i][j] != cell and hint_board[i][j] != -1)
+            for i, row in enumerate(hint_board):
+                for j, cell in enumerate(row):
+                    if cell == piece_id:
+                        pygame.draw.rect(
+                            self.screen, (0, 120, 255),
+                            pygame.Rect(margin + (j * square_size), margin + (i * square_size) + 50,
+                                        square_size, square_size),
+                            width=3
+                        )
+
+        text_img = self.font14.render(line, True, (255, 255, 255))
+        self.screen.blit(text_img, (button_width + 20, start_height))